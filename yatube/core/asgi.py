@@ -0,0 +1,194 @@
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+BODY_END = object()
+STREAM_QUEUE_SIZE = 16
+
+
+def wsgi_string(value):
+    """Строка пути, как её кладёт в environ WSGI-сервер (PEP 3333).
+
+    В ASGI путь уже раскодирован в unicode, а WSGIRequest ждёт байты
+    UTF-8, прочитанные как latin-1, и перекодирует их обратно.
+    """
+    return value.encode('utf-8').decode('latin-1')
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-запроса из ASGI scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': wsgi_string(scope.get('root_path', '')),
+        'PATH_INFO': wsgi_string(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            # Несколько Cookie склеиваются так же, как пары в одном.
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+class AsgiHandler:
+    """ASGI-приложение поверх обычного WSGI-обработчика Django.
+
+    Django 2.2 не умеет асинхронные представления, поэтому запрос
+    целиком, вместе с запросами к БД, выполняется в пуле из ASGI_THREADS
+    потоков. Цикл событий в это время принимает новые соединения и
+    ждёт тела запросов, а лишние запросы стоят в очереди пула, а не
+    занимают по потоку сервера каждый.
+    """
+
+    def __init__(self, max_workers=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип scope: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_event_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        response, body = await loop.run_in_executor(
+            self.executor, self.run, build_environ(scope, body),
+            start_response,
+        )
+        await send({
+            'type': 'http.response.start',
+            'status': started['status'],
+            'headers': started['headers'],
+        })
+        if body is None:
+            await self.stream(response, send)
+            body = b''
+        await send({'type': 'http.response.body', 'body': body})
+
+    def run(self, environ, start_response):
+        """Обрабатывает запрос; обычный ответ сразу собирает целиком.
+
+        close() шлёт request_finished, который закрывает соединение с
+        БД, поэтому вызываем его в том же потоке, что и представление.
+        """
+        response = self.wsgi(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return response, None
+        try:
+            return response, b''.join(response)
+        finally:
+            response.close()
+
+    async def stream(self, response, send):
+        """Отдаёт потоковый ответ по частям, не занимая цикл событий.
+
+        Ответ перебирается целиком в одном потоке пула: курсор БД, из
+        которого читает генератор, нельзя передавать между потоками.
+        Куски идут через ограниченную очередь, так что медленный клиент
+        притормаживает генератор, а не копит ответ в памяти.
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                for chunk in response:
+                    if stopped.is_set():
+                        break
+                    if chunk:
+                        asyncio.run_coroutine_threadsafe(
+                            queue.put(chunk), loop
+                        ).result()
+            finally:
+                response.close()
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(BODY_END), loop
+                ).result()
+
+        job = loop.run_in_executor(self.executor, produce)
+        chunk = None
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is BODY_END:
+                    break
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        finally:
+            # Клиент ушёл: останавливаем генератор и освобождаем очередь.
+            stopped.set()
+            while chunk is not BODY_END:
+                chunk = await queue.get()
+            await job
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return AsgiHandler()
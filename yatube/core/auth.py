@@ -0,0 +1,251 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, _get_user_session_key,
+    get_user_model, load_backend,
+)
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare, get_random_string
+from django.utils.functional import SimpleLazyObject
+
+from .checks import is_shared_cache
+
+User = get_user_model()
+
+AUTH_USER_PREFIX = 'auth_user:v1'
+# Поля, которые нужны шапке, проверкам доступа и карточкам. Остальные
+# отложены: обращение к ним, как к only(), догрузит их из БД.
+SNAPSHOT_FIELDS = (
+    'username', 'first_name', 'last_name', 'email',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+class LRUCache:
+    """Небольшой кеш в памяти процесса с вытеснением и сроком жизни."""
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_lock = threading.Lock()
+_local_users = None
+
+
+def local_users():
+    """LRU процесса; создаётся по текущим настройкам AUTH_USER_CACHE."""
+    global _local_users
+    with _lock:
+        if _local_users is None:
+            config = settings.AUTH_USER_CACHE
+            _local_users = LRUCache(
+                config['LOCAL_SIZE'], config['LOCAL_TIMEOUT']
+            )
+        return _local_users
+
+
+@receiver(setting_changed)
+def reset_local_users(setting, **kwargs):
+    global _local_users
+    if setting == 'AUTH_USER_CACHE':
+        with _lock:
+            _local_users = None
+
+
+def snapshot_key(user_id):
+    return f'{AUTH_USER_PREFIX}:{user_id}'
+
+
+def generation_key(user_id):
+    return f'{AUTH_USER_PREFIX}:generation:{user_id}'
+
+
+def shared_cache():
+    """Общий кеш снимков или None, если он есть только у процесса.
+
+    Кеш в памяти процесса не узнаёт о сбросе в других процессах, и
+    снимок в нём жил бы TIMEOUT секунд. Без общего кеша снимок читается
+    из БД, и устаревать он может только в LRU — на LOCAL_TIMEOUT.
+    """
+    alias = settings.AUTH_USER_CACHE['CACHE']
+    if not is_shared_cache(alias):
+        return None
+    return caches[alias]
+
+
+def get_generation(cache, user_id):
+    """Поколение снимков пользователя; сброс заменяет его новым."""
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # add(): из двух процессов, создающих поколение, побеждает один.
+        cache.add(key, get_random_string(12), None)
+        generation = cache.get(key)
+    return generation
+
+
+def make_snapshot(user):
+    """Поля пользователя и хеш для проверки сессии — без хеша пароля."""
+    return {
+        'id': user.pk,
+        'fields': [getattr(user, name) for name in SNAPSHOT_FIELDS],
+        'session_hash': user.get_session_auth_hash(),
+    }
+
+
+def build_user(snapshot):
+    """Пользователь из снимка, как из only(): save() пишет только
+    загруженные поля."""
+    values = dict(zip(SNAPSHOT_FIELDS, snapshot['fields']))
+    values[User._meta.pk.attname] = snapshot['id']
+    # from_db() ждёт значения в порядке полей модели.
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        router.db_for_write(User),
+        field_names,
+        [values[name] for name in field_names],
+    )
+
+
+def load_snapshot(user_id, backend):
+    """Снимок из кеша процесса, затем из общего, затем из БД.
+
+    В общем кеше снимок лежит под ключом с поколением, прочитанным до
+    запроса к БД. Если пользователь изменился, пока шёл запрос, сброс
+    уже заменил поколение, и запоздавший add() положит устаревший
+    снимок под ключ, который никто не прочитает.
+    """
+    key = snapshot_key(user_id)
+    local = local_users()
+    snapshot = local.get(key)
+    if snapshot is not None:
+        return snapshot
+    cache = shared_cache()
+    if cache is not None:
+        shared_key = f'{key}:{get_generation(cache, user_id)}'
+        snapshot = cache.get(shared_key)
+    if snapshot is None:
+        user = backend.get_user(user_id)
+        if user is None:
+            return None
+        snapshot = make_snapshot(user)
+        if cache is not None:
+            cache.add(
+                shared_key, snapshot, settings.AUTH_USER_CACHE['TIMEOUT']
+            )
+    local.set(key, snapshot)
+    return snapshot
+
+
+def get_user(request):
+    """django.contrib.auth.get_user() с пользователем из кеша.
+
+    Сессия проверяется так же: хеш в сессии сравнивается с хешем из
+    снимка, и после смены пароля старые сессии сбрасываются.
+    """
+    try:
+        user_id = _get_user_session_key(request)
+        backend_path = request.session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    snapshot = load_snapshot(user_id, load_backend(backend_path))
+    if snapshot is None:
+        return AnonymousUser()
+    session_hash = request.session.get(HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, snapshot['session_hash'])):
+        request.session.flush()
+        return AnonymousUser()
+    return build_user(snapshot)
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware без запроса к auth_user.
+
+    Снимок пользователя живёт в LRU процесса LOCAL_TIMEOUT секунд и,
+    если CACHE общий для процессов, в нём TIMEOUT секунд. Сохранение,
+    удаление пользователя и выход сбрасывают LRU этого процесса и
+    меняют поколение в общем кеше; в других процессах устаревший
+    снимок живёт не дольше LOCAL_TIMEOUT.
+    """
+
+    def process_request(self, request):
+        assert hasattr(request, 'session'), (
+            'CachedAuthenticationMiddleware требует SessionMiddleware '
+            'выше в MIDDLEWARE.'
+        )
+        request.user = SimpleLazyObject(lambda: get_user(request))
+
+
+def invalidate(user_id):
+    key = snapshot_key(user_id)
+
+    def delete():
+        local_users().delete(key)
+        cache = shared_cache()
+        if cache is not None:
+            cache.set(
+                generation_key(user_id), get_random_string(12), None
+            )
+
+    # Сразу и после коммита: запрос, прочитавший старую строку до
+    # коммита, не оставит в кеше устаревший снимок.
+    delete()
+    transaction.on_commit(delete)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_on_user_change(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+@receiver(user_logged_out)
+def invalidate_on_logout(sender, request, user, **kwargs):
+    if user is not None:
+        invalidate(user.pk)
@@ -0,0 +1,139 @@
+import json
+import resource
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(timings_ms):
+    return {
+        'count': len(timings_ms),
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+    }
+
+
+def rss_kb():
+    """Текущий и пиковый объём резидентной памяти процесса в КБ."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        current = pages * resource.getpagesize() // 1024
+    except OSError:
+        current = peak
+    return {'rss_kb': current, 'max_rss_kb': peak}
+
+
+def measure(func, repeat, before=None):
+    """Время каждого из repeat вызовов в мс и запросы к БД за вызов.
+
+    before вызывается перед каждым замером и в него не входит.
+    """
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(captured)
+    return timings, queries
+
+
+@contextmanager
+def test_database(verbosity=0, name=None):
+    """Временная тестовая база, чтобы не трогать рабочие данные.
+
+    name — файл для базы; без него SQLite создаёт базу в памяти.
+    """
+    test_settings = connection.settings_dict['TEST']
+    default_name = test_settings['NAME']
+    if name is not None:
+        test_settings['NAME'] = name
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = default_name
+
+
+def seed(users, groups, posts, batch_size=1000):
+    """Наполняет базу синтетическими данными нужного масштаба.
+
+    Пользователи и группы создаются через mixer, посты — bulk_create
+    с текстом от Faker, затем пересчитываются счётчики и поисковый
+    индекс, которые bulk_create обходит.
+    """
+    from faker import Faker
+    from mixer.backend.django import mixer
+
+    from posts import search
+    from posts.counters import rebuild_post_counters
+    from posts.models import Group, Post, User
+
+    fake = Faker('ru_RU')
+    authors = list(mixer.cycle(users).blend(User))
+    group_list = list(mixer.cycle(groups).blend(Group))
+    texts = (
+        Post(
+            text=fake.text(200),
+            author=authors[n % len(authors)],
+            group=group_list[n % len(group_list)] if n % 3 else None,
+        )
+        for n in range(posts)
+    )
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            break
+        Post.objects.bulk_create(batch)
+    rebuild_post_counters()
+    search.get_backend().index_rows(
+        Post.objects.values_list('pk', 'text').iterator()
+    )
+    return authors, group_list
+
+
+def compare(report, baseline, threshold):
+    """Маршруты, у которых p95 вырос больше чем на threshold процентов."""
+    regressions = []
+    for name, current in report['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous or not previous['p95_ms']:
+            continue
+        change = (current['p95_ms'] / previous['p95_ms'] - 1) * 100
+        current['p95_change_pct'] = round(change, 1)
+        if change > threshold or current['queries'] > previous['queries']:
+            regressions.append(name)
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def dump_report(report, stream):
+    stream.write(
+        json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+        + '\n'
+    )
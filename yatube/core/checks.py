@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Кеши, у которых каждый процесс видит только свои записи.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def is_shared_cache(alias):
+    """Видят ли все процессы сервера одни и те же записи кеша alias."""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register('caches')
+def check_session_cache(app_configs, **kwargs):
+    """Сессии в кеше процесса переживают выход в других процессах.
+
+    После logout или flush() в одном процессе сессия остаётся в кеше
+    остальных до истечения срока и продолжает работать.
+    """
+    if settings.SESSION_ENGINE not in CACHED_SESSION_ENGINES:
+        return []
+    if is_shared_cache(settings.SESSION_CACHE_ALIAS):
+        return []
+    return [Error(
+        f'{settings.SESSION_ENGINE} требует общего для всех процессов '
+        f'кеша, а SESSION_CACHE_ALIAS = '
+        f'{settings.SESSION_CACHE_ALIAS!r} хранится в памяти процесса.',
+        hint='Укажите Memcached или Redis в CACHES или выберите '
+             'YATUBE_SESSION_TIER=db.',
+        id='core.E001',
+    )]
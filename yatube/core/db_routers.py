@@ -0,0 +1,46 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def current_replica():
+    """Алиас реплики, из которой читает текущий запрос, или None."""
+    return getattr(_state, 'alias', None)
+
+
+@contextmanager
+def read_from_replica(alias=None):
+    """Направляет чтение внутри блока в одну случайную реплику.
+
+    Одна реплика на весь запрос: у разных реплик разное отставание, и
+    страница не должна собираться из разных версий данных.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if alias is None and replicas:
+        alias = random.choice(replicas)
+    previous = current_replica()
+    _state.alias = alias
+    try:
+        yield alias
+    finally:
+        _state.alias = previous
+
+
+class ReplicaRouter:
+    """Чтение — из реплики, если запрос её разрешил, запись — в default."""
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
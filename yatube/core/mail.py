@@ -0,0 +1,186 @@
+import atexit
+import logging
+import queue
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_queue = None
+
+
+def is_transient(error):
+    """Стоит ли повторять отправку после такой ошибки.
+
+    Повторяются разрыв соединения, ответы 4xx и сетевые ошибки.
+    Постоянные отказы 5xx (неверный адрес, письмо отвергнуто) повтор не
+    исправит. SMTPException — подкласс OSError, поэтому он проверяется
+    раньше.
+    """
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(
+            400 <= code < 500 for code, _ in error.recipients.values()
+        )
+    if isinstance(error, smtplib.SMTPException):
+        return False
+    return isinstance(error, OSError)
+
+
+class MailQueue:
+    """Очередь писем и пул потоков, отправляющих их через backend.
+
+    Поток берёт до batch_size писем, подождав остальные flush_interval
+    секунд, и отправляет их через одно соединение: для SMTP это один
+    вход на сервер на пачку, а не на письмо. Временную ошибку поток
+    повторяет retries раз с удвоением паузы и продолжает с письма, на
+    котором остановился, — уже отправленные не уходят повторно. Письмо,
+    которое не ушло и после повторов или получило постоянный отказ,
+    пишется в лог и отбрасывается.
+    """
+
+    def __init__(self, backend, workers=2, batch_size=20,
+                 flush_interval=0.1, retries=3, retry_delay=1.0,
+                 max_size=10000):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.messages = queue.Queue(maxsize=max_size)
+        self.workers = workers
+        self.threads = []
+        self.stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def depth(self):
+        return self.messages.qsize()
+
+    def put(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # Очередь переполнена: лучше задержать запрос одной
+            # попыткой отправки, чем потерять письмо со ссылкой для
+            # сброса пароля. Паузы между повторами запрос не ждёт.
+            self.deliver([message], retries=0)
+
+    def take_batch(self, timeout):
+        try:
+            batch = [self.messages.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.messages.get(timeout=remaining))
+                else:
+                    batch.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def deliver(self, batch, retries=None):
+        if retries is None:
+            retries = self.retries
+        attempt = 0
+        while batch:
+            try:
+                with get_connection(self.backend) as connection:
+                    while batch:
+                        connection.send_messages(batch[:1])
+                        batch = batch[1:]
+                        self.counted('sent')
+            except Exception as error:
+                attempt += 1
+                if is_transient(error) and attempt <= retries:
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                    continue
+                logger.exception(
+                    'Письмо для %s не отправлено', batch[0].to
+                )
+                batch = batch[1:]
+                self.counted('failed')
+                attempt = 0
+
+    def counted(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def drain(self):
+        """Отправляет всё, что уже в очереди, в текущем потоке."""
+        while True:
+            batch = self.take_batch(timeout=0)
+            if not batch:
+                return
+            self.deliver(batch)
+
+    def run(self):
+        while not self.stopping.is_set():
+            batch = self.take_batch(timeout=0.5)
+            if batch:
+                self.deliver(batch)
+        self.drain()
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self.run, name=f'mail-{number}', daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+
+def get_queue():
+    global _queue
+    with _lock:
+        if _queue is None:
+            config = settings.EMAIL_QUEUE
+            _queue = MailQueue(
+                config['BACKEND'],
+                workers=config['WORKERS'],
+                batch_size=config['BATCH_SIZE'],
+                flush_interval=config['FLUSH_INTERVAL'],
+                retries=config['RETRIES'],
+                retry_delay=config['RETRY_DELAY'],
+                max_size=config['MAX_SIZE'],
+            )
+            _queue.start()
+            profiling.registry.gauge('mail_queue_depth', _queue.depth)
+            atexit.register(_queue.stop)
+    return _queue
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """EMAIL_BACKEND, который только ставит письма в очередь.
+
+    Представление не ждёт ни диска, ни SMTP: письма отправляет пул
+    MailQueue через backend из EMAIL_QUEUE['BACKEND'].
+    """
+
+    def send_messages(self, email_messages):
+        mail_queue = get_queue()
+        for message in email_messages:
+            mail_queue.put(message)
+        profiling.count('emails_queued', len(email_messages))
+        return len(email_messages)
@@ -0,0 +1,134 @@
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core import benchmark
+from core.asgi import AsgiHandler
+from core.servers import ASGIServerThread, WSGIServerThread
+
+
+def fetch(base_url, path):
+    """Время одного GET в мс; новое соединение на каждый запрос."""
+    address = urlsplit(base_url)
+    connection = http.client.HTTPConnection(
+        address.hostname, address.port, timeout=60
+    )
+    started = time.perf_counter()
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise CommandError(f'{base_url}{path}: статус {response.status}')
+    return (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность WSGI и ASGI при параллельной '
+        'нагрузке на ленты и страницу поста. По умолчанию поднимает оба '
+        'сервера в процессе над временной базой с синтетическими данными; '
+        'с --wsgi-url и --asgi-url нагружает уже запущенные серверы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[1, 8, 32],
+            help='Сколько клиентов шлют запросы одновременно.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов на каждый уровень параллельности.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Размер пула потоков ASGI-приложения.',
+        )
+        parser.add_argument('--wsgi-url', help='Уже запущенный WSGI.')
+        parser.add_argument('--asgi-url', help='Уже запущенный ASGI.')
+        parser.add_argument(
+            '--paths', nargs='+',
+            help='Адреса для внешних серверов, по умолчанию «/».',
+        )
+
+    def build_paths(self, author, group, post):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_post', args=[group.slug]),
+            reverse('posts:profile', args=[author.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+
+    def run_load(self, base_url, paths, concurrency, total):
+        targets = [paths[n % len(paths)] for n in range(total)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(
+                lambda path: fetch(base_url, path), targets
+            ))
+        elapsed = time.perf_counter() - started
+        return {
+            'concurrency': concurrency,
+            'requests_per_second': round(total / elapsed, 1),
+            **benchmark.summarize(timings),
+        }
+
+    def run_all(self, servers, paths, options):
+        report = {}
+        for name, base_url in servers.items():
+            # Прогрев: кеши шаблонов и лент, соединения с БД.
+            self.run_load(base_url, paths, 1, len(paths))
+            report[name] = [
+                self.run_load(base_url, paths, level, options['requests'])
+                for level in options['concurrency']
+            ]
+        return report
+
+    def handle(self, *args, **options):
+        external = {
+            name: options[f'{name}_url']
+            for name in ('wsgi', 'asgi')
+            if options[f'{name}_url']
+        }
+        if external:
+            paths = options['paths'] or ['/']
+            report = self.run_all(external, paths, options)
+            benchmark.dump_report(report, self.stdout)
+            return
+        with benchmark.test_database():
+            authors, groups = benchmark.seed(
+                options['users'], options['groups'], options['posts']
+            )
+            post = authors[0].post.first()
+            if post is None:
+                raise CommandError('Нужен хотя бы один пост у автора.')
+            paths = self.build_paths(authors[0], groups[0], post)
+            servers = [
+                WSGIServerThread(WSGIHandler()),
+                ASGIServerThread(AsgiHandler(options['threads'])),
+            ]
+            for server in servers:
+                server.start()
+            try:
+                report = self.run_all(
+                    {
+                        'wsgi': f'http://127.0.0.1:{servers[0].port}',
+                        'asgi': f'http://127.0.0.1:{servers[1].port}',
+                    },
+                    paths,
+                    options,
+                )
+            finally:
+                for server in servers:
+                    server.stop()
+        benchmark.dump_report(report, self.stdout)
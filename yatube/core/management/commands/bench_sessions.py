@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Пропускная способность главной страницы для вошедших '
+        'пользователей с каждым хранилищем сессий из SESSION_TIERS. '
+        'Запросы идут из нескольких потоков к файловой SQLite.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность прогона каждого хранилища, секунд.',
+        )
+        parser.add_argument(
+            '--activity-interval', type=int,
+            default=settings.SESSION_ACTIVITY_INTERVAL,
+            help='SESSION_ACTIVITY_INTERVAL; 0 — запись на каждый запрос.',
+        )
+        parser.add_argument(
+            '--tiers', nargs='+', default=sorted(settings.SESSION_TIERS),
+            choices=sorted(settings.SESSION_TIERS),
+        )
+
+    def reader(self, users, deadline, timings):
+        url = reverse('posts:index')
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        number = 0
+        while time.perf_counter() < deadline:
+            client = clients[number % len(clients)]
+            number += 1
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    def run_worker(self, *args):
+        try:
+            self.reader(*args)
+        finally:
+            connections.close_all()
+
+    def count_queries(self, user):
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:index')
+        client.get(url)
+        _, queries = benchmark.measure(lambda: client.get(url), 1)
+        return queries
+
+    def run_tier(self, tier, authors, options):
+        engine = settings.SESSION_TIERS[tier]
+        with override_settings(
+            SESSION_ENGINE=engine,
+            SESSION_ACTIVITY_INTERVAL=options['activity_interval'],
+        ):
+            queries = self.count_queries(authors[0])
+            connection.close()
+            threads = options['threads']
+            deadline = time.perf_counter() + options['duration']
+            results = [[] for _ in range(threads)]
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(
+                    lambda number: self.run_worker(
+                        authors[number::threads], deadline, results[number]
+                    ),
+                    range(threads),
+                ))
+        timings = [timing for result in results for timing in result]
+        return {
+            'engine': engine,
+            'queries': queries,
+            'per_second': round(len(timings) / options['duration'], 1),
+            **benchmark.summarize(timings),
+        }
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='bench_sessions_')
+        try:
+            with benchmark.test_database(
+                    name=os.path.join(directory, 'bench.sqlite3')):
+                authors, _ = benchmark.seed(
+                    options['users'], options['groups'], options['posts']
+                )
+                report = {
+                    'threads': options['threads'],
+                    'activity_interval': options['activity_interval'],
+                    'tiers': {
+                        tier: self.run_tier(tier, authors, options)
+                        for tier in options['tiers']
+                    },
+                }
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        benchmark.dump_report(report, self.stdout)
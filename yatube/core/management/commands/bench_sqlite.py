@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Смешанная нагрузка на файловую SQLite: авторы публикуют посты '
+        'через post_create, читатели открывают ленты. Сравнивает профили '
+        'из SQLITE_PROFILES по задержкам и ошибкам блокировки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность прогона каждого профиля, секунд.',
+        )
+        parser.add_argument(
+            '--profiles', nargs='+', default=['stock', 'production'],
+            choices=sorted(settings.SQLITE_PROFILES),
+        )
+
+    def writer(self, user, deadline, result):
+        client = Client()
+        client.force_login(user)
+        url = reverse('posts:post_create')
+        number = 0
+        while time.perf_counter() < deadline:
+            number += 1
+            self.timed(
+                lambda: client.post(url, {'text': f'Пост {number}'}),
+                result, expected=302,
+            )
+
+    def reader(self, paths, deadline, result):
+        client = Client()
+        number = 0
+        while time.perf_counter() < deadline:
+            path = paths[number % len(paths)]
+            number += 1
+            self.timed(lambda: client.get(path), result, expected=200)
+
+    def timed(self, request, result, expected):
+        """Засчитывает ответ со статусом expected, остальное — ошибка."""
+        started = time.perf_counter()
+        try:
+            response = request()
+        except OperationalError:
+            # database is locked: писатель не дождался блокировки
+            result['errors'] += 1
+            return
+        if response.status_code != expected:
+            result['errors'] += 1
+            return
+        result['timings'].append((time.perf_counter() - started) * 1000)
+
+    def run_worker(self, target, *args):
+        try:
+            target(*args)
+        finally:
+            connections.close_all()
+
+    def run_profile(self, profile, options):
+        config = settings.SQLITE_PROFILES[profile]
+        directory = tempfile.mkdtemp(prefix='bench_sqlite_')
+        connection.settings_dict['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+        try:
+            # Ограничение частоты ответило бы писателям 429 после
+            # десятого поста: мерим базу, а не RATELIMIT.
+            overrides = override_settings(
+                SQLITE_PRAGMAS=config['PRAGMAS'],
+                RATELIMIT={**settings.RATELIMIT, 'ENABLED': False},
+            )
+            database = os.path.join(directory, 'bench.sqlite3')
+            with overrides, benchmark.test_database(name=database):
+                return self.run_load(options)
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = (
+                settings.DATABASES['default']['CONN_MAX_AGE']
+            )
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run_load(self, options):
+        authors, groups = benchmark.seed(
+            options['users'], options['groups'], options['posts']
+        )
+        post = authors[0].post.first()
+        paths = [
+            reverse('posts:index'),
+            reverse('posts:group_post', args=[groups[0].slug]),
+            reverse('posts:profile', args=[authors[0].username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+        connection.close()
+        results = {
+            'write': {'timings': [], 'errors': 0},
+            'read': {'timings': [], 'errors': 0},
+        }
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        jobs = [
+            (self.writer, authors[n % len(authors)], deadline,
+             {'timings': [], 'errors': 0}, 'write')
+            for n in range(options['writers'])
+        ] + [
+            (self.reader, paths, deadline,
+             {'timings': [], 'errors': 0}, 'read')
+            for _ in range(options['readers'])
+        ]
+
+        def run(job):
+            target, subject, until, result, kind = job
+            self.run_worker(target, subject, until, result)
+            with lock:
+                results[kind]['timings'] += result['timings']
+                results[kind]['errors'] += result['errors']
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            list(pool.map(run, jobs))
+        return {
+            kind: {
+                'per_second': round(
+                    len(result['timings']) / options['duration'], 1
+                ),
+                'errors': result['errors'],
+                **benchmark.summarize(result['timings']),
+            }
+            for kind, result in results.items()
+        }
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('Команда сравнивает только профили SQLite.')
+            return
+        report = {
+            'writers': options['writers'],
+            'readers': options['readers'],
+            'profiles': {
+                profile: self.run_profile(profile, options)
+                for profile in options['profiles']
+            },
+        }
+        benchmark.dump_report(report, self.stdout)
@@ -0,0 +1,99 @@
+import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from core import benchmark
+from posts.cache import feed_cache
+from posts.models import Group, Post, User
+
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+INLINING_LOADERS = [('core.template_loaders.Loader', BASE_LOADERS)]
+MODES = {
+    'plain': BASE_LOADERS,
+    'cached': [('django.template.loaders.cached.Loader', BASE_LOADERS)],
+    'cached_inlined': [
+        ('django.template.loaders.cached.Loader', INLINING_LOADERS),
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендеринга ленты группы с 10 и 100 постами '
+        'без кеша шаблонов, с кешем и с кешем и подстановкой include.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10, 100],
+            help='Сколько постов на странице.',
+        )
+
+    def make_engine(self, mode, loaders):
+        config = settings.TEMPLATES[0]
+        return DjangoTemplates({
+            'NAME': mode,
+            'DIRS': config['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {**config['OPTIONS'], 'loaders': loaders},
+        })
+
+    def make_context(self, size):
+        """Контекст страницы группы из несохранённых объектов, без БД."""
+        group = Group(pk=1, title='Группа', slug='group', description='')
+        author = User(pk=1, username='author', first_name='Автор')
+        now = timezone.now()
+        posts = [
+            Post(
+                pk=n + 1,
+                text=f'Текст поста номер {n}',
+                pub_date=now - datetime.timedelta(minutes=n),
+                author=author,
+                group=group,
+            )
+            for n in range(size)
+        ]
+        url = reverse('posts:group_post', args=[group.slug])
+        request = RequestFactory().get(url)
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(url)
+        return request, {
+            'group': group,
+            'page_obj': Paginator(posts, size).get_page(1),
+        }
+
+    def handle(self, *args, **options):
+        report = {}
+        for size in options['sizes']:
+            request, context = self.make_context(size)
+            rendered = {}
+            for mode, loaders in MODES.items():
+                engine = self.make_engine(mode, loaders)
+
+                def render():
+                    template = engine.get_template('posts/group_list.html')
+                    return template.render(context, request)
+
+                # Кеш карточек сбрасываем, чтобы мерить сам рендеринг.
+                feed_cache().clear()
+                rendered[mode] = render()
+                timings, _ = benchmark.measure(
+                    render, options['repeat'], before=feed_cache().clear
+                )
+                report[f'{mode}_{size}'] = benchmark.summarize(timings)
+            if len(set(rendered.values())) != 1:
+                raise CommandError(
+                    f'Режимы дают разный HTML для {size} постов.'
+                )
+        benchmark.dump_report(report, self.stdout)
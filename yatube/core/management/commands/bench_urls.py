@@ -0,0 +1,134 @@
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlencode, urlsafe_base64_encode
+
+from about import urls as about_urls
+from core import benchmark
+from posts import urls as posts_urls
+from users import urls as users_urls
+
+URL_MODULES = (posts_urls, users_urls, about_urls)
+# Маршруты, доступные только авторизованному пользователю
+LOGIN_REQUIRED = {
+    'posts:post_create',
+    'posts:post_edit',
+    'posts:follow_index',
+    'posts:profile_follow',
+    'posts:profile_unfollow',
+    'users:password_change_form',
+    'users:password_change_done',
+}
+# Маршруты, после которых сессию нужно восстанавливать
+RELOGIN = {'users:logout'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон всех маршрутов posts, users и about на '
+        'синтетических данных во временной базе. Печатает JSON с '
+        'p50/p95/p99, числом запросов к БД и памятью процесса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Сколько раз запрашивать каждый маршрут.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать отчёт, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--baseline', help='Отчёт прошлого прогона для сравнения.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20.0,
+            help='Допустимый рост p95 относительно baseline, %%.',
+        )
+
+    def build_urls(self, author, group, post):
+        """Адреса всех маршрутов с подставленными тестовыми данными."""
+        values = {
+            'slug': group.slug,
+            'fmt': 'rss',
+            'username': author.username,
+            'post_id': post.pk,
+            'uidb64': urlsafe_base64_encode(force_bytes(author.pk)),
+            'token': default_token_generator.make_token(author),
+        }
+        urls = {}
+        for module in URL_MODULES:
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                kwargs = {
+                    key: values[key] for key in pattern.pattern.converters
+                }
+                urls[name] = reverse(name, kwargs=kwargs)
+        urls['posts:search'] += '?' + urlencode({'q': post.text.split()[0]})
+        return urls
+
+    def run_route(self, name, url, repeat, user):
+        client = Client()
+        if name in LOGIN_REQUIRED or name in RELOGIN:
+            client.force_login(user)
+        status = client.get(url).status_code
+        timings, queries = benchmark.measure(
+            lambda: client.get(url),
+            repeat,
+            before=(
+                (lambda: client.force_login(user)) if name in RELOGIN
+                else None
+            ),
+        )
+        return {
+            'url': url,
+            'status': status,
+            'queries': queries,
+            **benchmark.summarize(timings),
+        }
+
+    def handle(self, *args, **options):
+        report = {
+            'scale': {
+                key: options[key] for key in ('users', 'groups', 'posts')
+            },
+            'repeat': options['repeat'],
+            'routes': {},
+        }
+        with benchmark.test_database():
+            authors, groups = benchmark.seed(
+                options['users'], options['groups'], options['posts']
+            )
+            author = authors[0]
+            post = author.post.first()
+            if post is None:
+                raise CommandError('Нужен хотя бы один пост у автора.')
+            urls = self.build_urls(author, groups[0], post)
+            for name, url in urls.items():
+                self.stderr.write(f'{name} {url}')
+                report['routes'][name] = self.run_route(
+                    name, url, options['repeat'], author
+                )
+            report['memory'] = benchmark.rss_kb()
+        regressions = []
+        if options['baseline']:
+            regressions = benchmark.compare(
+                report,
+                benchmark.load_report(options['baseline']),
+                options['threshold'],
+            )
+            report['regressions'] = regressions
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                benchmark.dump_report(report, file)
+        else:
+            benchmark.dump_report(report, self.stdout)
+        if regressions:
+            raise CommandError(
+                'Регрессия производительности: ' + ', '.join(regressions)
+            )
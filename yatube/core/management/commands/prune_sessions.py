@@ -0,0 +1,47 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет просроченные сессии из django_session пачками. В отличие '
+        'от clearsessions не держит блокировку записи SQLite на всё '
+        'удаление: каждая пачка — отдельная короткая транзакция.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Пауза между пачками, секунд: окно для других писателей.',
+        )
+
+    def handle(self, *args, **options):
+        engine = import_module(settings.SESSION_ENGINE)
+        if not issubclass(engine.SessionStore, SessionStore):
+            self.stdout.write(
+                f'{settings.SESSION_ENGINE} не хранит сессии в БД.'
+            )
+            return
+        expired = Session.objects.filter(
+            expire_date__lt=timezone.now()
+        ).values('session_key')
+        total = 0
+        while True:
+            # DELETE ... WHERE session_key IN (SELECT ... LIMIT n):
+            # поиск по индексу expire_date, без списка ключей в Python.
+            deleted, _ = Session.objects.filter(
+                session_key__in=expired[:options['batch_size']]
+            ).delete()
+            total += deleted
+            if deleted < options['batch_size']:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Удалено сессий: {total}')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.smtp import LocalSMTPServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Локальный SMTP-сервер, который принимает письма и печатает их '
+        'заголовки. Для проверки отправки через SMTP без настоящего '
+        'сервера: EMAIL_QUEUE["BACKEND"] = smtp.EmailBackend, '
+        'EMAIL_PORT = порт команды.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=1025)
+
+    def handle(self, *args, **options):
+        server = LocalSMTPServer(port=options['port']).start()
+        self.stdout.write(f'SMTP слушает 127.0.0.1:{server.port}')
+        shown = 0
+        try:
+            while True:
+                time.sleep(0.5)
+                for envelope in server.messages[shown:]:
+                    message = envelope['message']
+                    self.stdout.write(
+                        f'{message["To"]}: {message["Subject"]}'
+                    )
+                shown = len(server.messages)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
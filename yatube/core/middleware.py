@@ -0,0 +1,162 @@
+import cProfile
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from . import db_routers, profiling, ratelimit
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+ACTIVITY_SESSION_KEY = 'last_activity'
+
+
+class ProfilingMiddleware:
+    """Собирает время запроса, SQL и шаблонов по именам представлений.
+
+    Для доли запросов PROFILING['SAMPLE_RATE'] дополнительно снимает
+    профиль cProfile. Агрегаты отдаёт представление core:profiling.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = settings.PROFILING
+        if not config['ENABLED']:
+            return self.get_response(request)
+        profiler = None
+        if random.random() < config['SAMPLE_RATE']:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with profiling.collect_request() as stats, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(profiling.sql_timer)
+                )
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # В потоке уже работает другой профилировщик
+                    profiler = None
+                else:
+                    stack.callback(profiler.disable)
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        profiling.registry.record(
+            match.view_name if match else '<unresolved>',
+            wall_ms,
+            stats,
+            profile=(
+                profiling.format_profile(profiler, config['PROFILE_LIMIT'])
+                if profiler is not None else None
+            ),
+        )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Отправляет чтение представлений из REPLICA_VIEWS в реплику.
+
+    После любого изменяющего запроса пользователь REPLICA_STICKY_SECONDS
+    читает только из default (подписанная кука), чтобы сразу увидеть
+    свой пост, даже если реплика отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            request._replica_routing = stack
+            response = self.get_response(request)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 500
+        ):
+            response.set_signed_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                '1',
+                salt=settings.REPLICA_STICKY_COOKIE,
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+            )
+        return response
+
+    def is_sticky(self, request):
+        return request.get_signed_cookie(
+            settings.REPLICA_STICKY_COOKIE,
+            default=None,
+            salt=settings.REPLICA_STICKY_COOKIE,
+            max_age=settings.REPLICA_STICKY_SECONDS,
+        ) is not None
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and not self.is_sticky(request)
+        ):
+            request._replica_routing.enter_context(
+                db_routers.read_from_replica()
+            )
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к представлениям из RATELIMIT.
+
+    Превысившему лимит отвечает 429 с Retry-After, не вызывая
+    представление: ни формы, ни записи в БД, ни письма.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.RATELIMIT['ENABLED']:
+            return None
+        retry_after = ratelimit.check(
+            request, request.resolver_match.view_name
+        )
+        if not retry_after:
+            return None
+        profiling.count('ratelimited')
+        response = HttpResponse(
+            f'Слишком много запросов, повторите через {retry_after} с.',
+            status=429,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class SessionActivityMiddleware:
+    """Хранит в сессии время последнего запроса пользователя.
+
+    Изменённая сессия сохраняется целиком (UPDATE в БД, запись в кеш
+    или новая кука) и получает новый срок жизни, поэтому отметка
+    обновляется не чаще раза в SESSION_ACTIVITY_INTERVAL секунд:
+    срок сессии скользит, а записей почти нет.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            now = int(time.time())
+            last = request.session.get(ACTIVITY_SESSION_KEY, 0)
+            if now - last >= settings.SESSION_ACTIVITY_INTERVAL:
+                request.session[ACTIVITY_SESSION_KEY] = now
+        return response
@@ -0,0 +1,173 @@
+import io
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Верхние границы корзин гистограмм, мс
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_local = threading.local()
+
+
+class RequestStats:
+    """Счётчики одного запроса: SQL, время рендеринга шаблонов и
+    произвольные события (попадания в кеш и т. п.)."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.template_depth = 0
+        self.counters = defaultdict(int)
+
+
+def current_request():
+    return getattr(_local, 'stats', None)
+
+
+def count(name, value=1):
+    """Добавляет value к счётчику name текущего запроса."""
+    stats = current_request()
+    if stats is not None and value:
+        stats.counters[name] += value
+
+
+@contextmanager
+def collect_request():
+    _local.stats = RequestStats()
+    try:
+        yield _local.stats
+    finally:
+        _local.stats = None
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper()."""
+    stats = current_request()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if stats is not None:
+            stats.sql_count += 1
+            stats.sql_ms += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def template_timer():
+    """Засекает рендеринг шаблона верхнего уровня.
+
+    Шаблоны, отрисованные внутри другого шаблона, уже входят в его
+    время и второй раз не считаются.
+    """
+    stats = current_request()
+    if stats is None:
+        yield
+        return
+    stats.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.template_depth -= 1
+        if not stats.template_depth:
+            stats.template_ms += (time.perf_counter() - started) * 1000
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.total = 0.0
+
+    def add(self, value):
+        for index, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+
+    def as_dict(self, requests):
+        return {
+            'avg_ms': round(self.total / requests, 3) if requests else 0.0,
+            'buckets': {
+                ('+inf' if bound == float('inf') else f'le_{bound}'): count
+                for bound, count in zip(BUCKETS_MS, self.counts)
+            },
+        }
+
+
+class ViewStats:
+    def __init__(self, keep_profiles):
+        self.requests = 0
+        self.sql_queries = 0
+        self.wall = Histogram()
+        self.sql = Histogram()
+        self.template = Histogram()
+        self.counters = defaultdict(int)
+        self.profiles = deque(maxlen=keep_profiles)
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'sql_queries_avg': (
+                round(self.sql_queries / self.requests, 2)
+                if self.requests else 0.0
+            ),
+            'wall': self.wall.as_dict(self.requests),
+            'sql': self.sql.as_dict(self.requests),
+            'template': self.template.as_dict(self.requests),
+            'counters': dict(self.counters),
+            'profiles': list(self.profiles),
+        }
+
+
+class Registry:
+    """Агрегаты по именам представлений в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.gauges = {}
+        self.reset()
+
+    def reset(self, keep_profiles=5):
+        self.views = defaultdict(lambda: ViewStats(keep_profiles))
+
+    def record(self, view_name, wall_ms, stats, profile=None):
+        with self.lock:
+            view = self.views[view_name]
+            view.requests += 1
+            view.sql_queries += stats.sql_count
+            view.wall.add(wall_ms)
+            view.sql.add(stats.sql_ms)
+            view.template.add(stats.template_ms)
+            for name, value in stats.counters.items():
+                view.counters[name] += value
+            if profile is not None:
+                view.profiles.append(profile)
+
+    def gauge(self, name, read):
+        """Текущее значение read() попадёт в снимок под «<gauges>»."""
+        self.gauges[name] = read
+
+    def snapshot(self):
+        with self.lock:
+            data = {
+                name: view.as_dict() for name, view in self.views.items()
+            }
+        if self.gauges:
+            data['<gauges>'] = {
+                name: read() for name, read in self.gauges.items()
+            }
+        return data
+
+
+registry = Registry()
+
+
+def format_profile(profiler, limit):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
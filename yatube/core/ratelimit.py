@@ -0,0 +1,88 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+RATELIMIT_PREFIX = 'ratelimit'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'20/m' → (20, 60): не больше 20 запросов за 60 секунд."""
+    limit, period = rate.split('/')
+    return int(limit), PERIODS[period]
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def identities(request, scopes):
+    """Ключи счётчиков для каждого ограничения из scopes.
+
+    user — только для вошедших пользователей, ip — по REMOTE_ADDR
+    (за прокси его должен выставлять сам прокси), global — один
+    счётчик на всех.
+    """
+    for scope, rate in scopes.items():
+        if scope == 'user':
+            if not request.user.is_authenticated:
+                continue
+            ident = request.user.pk
+        elif scope == 'ip':
+            ident = client_ip(request)
+        elif scope == 'global':
+            ident = ''
+        else:
+            raise ValueError(f'Неизвестное ограничение: {scope}')
+        yield scope, ident, rate
+
+
+def hit(cache, name, limit, period, now=None):
+    """Засчитывает запрос; возвращает через сколько секунд можно снова.
+
+    Скользящее окно из двух фиксированных: запросы прошлого окна
+    берутся с весом оставшейся в нём доли времени. Всегда три операции
+    с кешем и никаких записей в БД. Отклонённые запросы тоже
+    считаются: клиент, который не ждёт, сам продлевает запрет.
+    """
+    now = time.time() if now is None else now
+    window = int(now // period)
+    current_key = f'{RATELIMIT_PREFIX}:{name}:{window}'
+    previous_key = f'{RATELIMIT_PREFIX}:{name}:{window - 1}'
+    cache.add(current_key, 0, period * 2)
+    current = cache.incr(current_key)
+    previous = cache.get(previous_key, 0)
+    elapsed = now / period - window
+    if previous * (1 - elapsed) + current <= limit:
+        return 0
+    if current > limit:
+        # Своё окно уже переполнено — ждать его конца.
+        return math.ceil((1 - elapsed) * period)
+    # Переполнено вместе с хвостом прошлого окна: ждать, пока хвост
+    # сократится настолько, чтобы текущий запрос уместился.
+    needed = 1 - (limit - current) / previous
+    return max(1, math.ceil((needed - elapsed) * period))
+
+
+def check(request, view_name):
+    """Секунды до снятия сработавшего ограничения или 0.
+
+    Ограничения проверяются по порядку, и после первого сработавшего
+    следующие не расходуются: запросы того, кто упёрся в личный
+    лимит, не съедают общий.
+    """
+    config = settings.RATELIMIT
+    scopes = config['VIEWS'].get(view_name)
+    if not scopes or request.method not in config['METHODS']:
+        return 0
+    cache = caches[config['CACHE']]
+    for scope, ident, rate in identities(request, scopes):
+        limit, period = parse_rate(rate)
+        retry_after = hit(
+            cache, f'{view_name}:{scope}:{ident}', limit, period
+        )
+        if retry_after:
+            return retry_after
+    return 0
@@ -0,0 +1,131 @@
+"""Простые локальные HTTP-серверы для нагрузочных прогонов.
+
+Не для боевого использования: поддерживают только то, что нужно
+benchmark-командам, — GET и POST с Content-Length, без keep-alive.
+"""
+import asyncio
+import threading
+from http import HTTPStatus
+from urllib.parse import unquote
+
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler,
+)
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServerThread(threading.Thread):
+    """Поток на каждое соединение, как у runserver и синхронных воркеров."""
+
+    def __init__(self, application, host='127.0.0.1', port=0):
+        super().__init__(daemon=True)
+        self.httpd = ThreadedWSGIServer(
+            (host, port), QuietWSGIRequestHandler, allow_reuse_address=True
+        )
+        self.httpd.daemon_threads = True
+        self.httpd.set_app(application)
+        self.port = self.httpd.server_address[1]
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ASGIServerThread(threading.Thread):
+    """Цикл событий asyncio в отдельном потоке, отдающий ASGI-приложение."""
+
+    def __init__(self, application, host='127.0.0.1', port=0):
+        super().__init__(daemon=True)
+        self.application = application
+        self.host = host
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(self.listen(port))
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def listen(self, port):
+        return await asyncio.start_server(self.handle, self.host, port)
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def stop(self):
+        async def close():
+            self.server.close()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+        self.loop.close()
+
+    async def handle(self, reader, writer):
+        try:
+            scope, body = await self.read_request(reader, writer)
+        except (ValueError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        messages = [
+            {'type': 'http.request', 'body': body, 'more_body': False},
+        ]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status = HTTPStatus(message['status'])
+                lines = [f'HTTP/1.1 {status.value} {status.phrase}']
+                lines += [
+                    f'{name.decode("latin-1")}: {value.decode("latin-1")}'
+                    for name, value in message.get('headers', ())
+                ]
+                lines.append('Connection: close')
+                writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            elif message['type'] == 'http.response.body':
+                writer.write(message.get('body', b''))
+                await writer.drain()
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            writer.close()
+
+    async def read_request(self, reader, writer):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        method, target, version = request_line.split(' ', 2)
+        headers = []
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, value = line.split(':', 1)
+            headers.append(
+                (name.strip().lower().encode(), value.strip().encode())
+            )
+        length = int(dict(headers).get(b'content-length', 0))
+        body = await reader.readexactly(length) if length else b''
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http',
+            'http_version': version.split('/', 1)[1],
+            'method': method,
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode(),
+            'query_string': query.encode('latin-1'),
+            'root_path': '',
+            'headers': headers,
+            'client': writer.get_extra_info('peername')[:2],
+            'server': (self.host, self.port),
+        }
+        return scope, body
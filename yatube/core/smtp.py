@@ -0,0 +1,130 @@
+import email
+import email.policy
+import socketserver
+import threading
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP: ровно столько, сколько нужно smtplib."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.sessions += 1
+        self.envelope = None
+        self.reply('220 localhost SMTP stand-in')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode(
+                'utf-8', 'replace'
+            ).strip().partition(' ')
+            handler = getattr(self, f'smtp_{command.upper()}', None)
+            if handler is None:
+                self.reply('502 Команда не поддерживается')
+            elif handler(argument) is False:
+                return
+
+    def smtp_HELO(self, argument):
+        self.reply('250 localhost')
+
+    smtp_EHLO = smtp_HELO
+
+    def smtp_MAIL(self, argument):
+        if self.server.take_failure():
+            self.reply('451 Временная ошибка, повторите позже')
+            return
+        self.envelope = {'from': argument, 'to': []}
+        self.reply('250 OK')
+
+    def smtp_RCPT(self, argument):
+        if self.envelope is None:
+            self.reply('503 Сначала MAIL')
+            return
+        address = argument.partition(':')[2].strip().strip('<>')
+        if address in self.server.rejected:
+            self.reply('550 Нет такого ящика')
+            return
+        self.envelope['to'].append(argument)
+        self.reply('250 OK')
+
+    def smtp_DATA(self, argument):
+        if self.envelope is None:
+            self.reply('503 Сначала MAIL')
+            return
+        self.reply('354 Конец письма — строка из точки')
+        self.envelope['message'] = email.message_from_bytes(
+            self.read_data(), policy=email.policy.default
+        )
+        with self.server.lock:
+            self.server.messages.append(self.envelope)
+        self.envelope = None
+        self.reply('250 OK')
+
+    def smtp_RSET(self, argument):
+        self.envelope = None
+        self.reply('250 OK')
+
+    def smtp_NOOP(self, argument):
+        self.reply('250 OK')
+
+    def smtp_QUIT(self, argument):
+        self.reply('221 Bye')
+        return False
+
+    def read_data(self):
+        lines = []
+        for line in self.rfile:
+            if line in (b'.\r\n', b'.\n'):
+                break
+            # Точка в начале строки удваивается отправителем.
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """SMTP-сервер в потоке процесса для тестов и разработки.
+
+    Письма не уходят дальше, а складываются в messages. fail_next
+    задаёт, сколько следующих писем получат временную ошибку 451,
+    адреса из rejected получают постоянный отказ 550.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.sessions = 0
+        self.fail_next = 0
+        self.rejected = set()
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def take_failure(self):
+        with self.lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,),
+            name='smtp-stand-in', daemon=True,
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,76 @@
+import re
+
+from django.conf import settings
+from django.template import Origin, TemplateDoesNotExist
+from django.template.loaders.base import Loader as BaseLoader
+
+# {% include 'name' %} и {% include "name" with a=b %} с именем-строкой
+INCLUDE_RE = re.compile(
+    r"""{%\s*include\s+(['"])(?P<name>[^'"]+)\1"""
+    r"""(?:\s+with\s+(?P<extra>(?:(?!%}).)*?))?\s*%}"""
+)
+MAX_DEPTH = 10
+
+
+class Loader(BaseLoader):
+    """Подставляет статические include прямо в текст шаблона.
+
+    Оборачивает другие загрузчики. Шаблоны из TEMPLATE_INLINE_INCLUDES,
+    подключённые через {% include %} с именем-строкой, вставляются в
+    родителя при компиляции, и при рендеринге не нужно искать и
+    отрисовывать отдельный шаблон на каждую карточку поста. Аргументы
+    with превращаются в {% with %}, include с only не трогаются.
+    Имеет смысл в паре с django.template.loaders.cached.Loader.
+    """
+
+    def __init__(self, engine, loaders):
+        super().__init__(engine)
+        self.loaders = engine.get_template_loaders(loaders)
+
+    def get_template_sources(self, template_name):
+        for loader in self.loaders:
+            for source in loader.get_template_sources(template_name):
+                # Origin с этим загрузчиком: иначе cached.Loader читает
+                # текст прямо у внутреннего загрузчика, мимо inline().
+                origin = Origin(
+                    name=source.name,
+                    template_name=source.template_name,
+                    loader=self,
+                )
+                origin.source = source
+                yield origin
+
+    def get_contents(self, origin):
+        contents = self.read(origin)
+        return self.inline(contents, (origin.template_name,))
+
+    def read(self, origin):
+        return origin.source.loader.get_contents(origin.source)
+
+    def load_source(self, template_name):
+        for origin in self.get_template_sources(template_name):
+            try:
+                return self.read(origin)
+            except TemplateDoesNotExist:
+                continue
+        raise TemplateDoesNotExist(template_name)
+
+    def inline(self, contents, chain):
+        inlined = settings.TEMPLATE_INLINE_INCLUDES
+
+        def replace(match):
+            name = match.group('name')
+            extra = (match.group('extra') or '').strip()
+            if (
+                name not in inlined
+                or name in chain
+                or len(chain) >= MAX_DEPTH
+                or extra.split()[-1:] == ['only']
+            ):
+                return match.group(0)
+            source = self.inline(self.load_source(name), chain + (name,))
+            if extra:
+                return f'{{% with {extra} %}}{source}{{% endwith %}}'
+            return source
+
+        return INCLUDE_RE.sub(replace, contents)
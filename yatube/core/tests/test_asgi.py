@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from urllib.parse import unquote
+
+from django.http import StreamingHttpResponse
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..asgi import AsgiHandler, build_environ
+
+User = get_user_model()
+
+
+def call(application, scope):
+    messages = [{'type': 'http.request', 'body': b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop()
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class AsgiHandlerTests(SimpleTestCase):
+
+    def test_page_is_served_through_thread_pool(self):
+        """Страница отдаётся через ASGI с теми же статусом и телом."""
+        application = AsgiHandler(max_workers=2)
+        sent = call(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': reverse('about:author'),
+            'headers': [(b'host', b'testserver')],
+        })
+        application.executor.shutdown()
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Об авторе'.encode(), body)
+
+    def test_environ_joins_repeated_headers(self):
+        environ = build_environ({
+            'method': 'POST',
+            'path': '/',
+            'query_string': b'a=1',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+                (b'cookie', b'a=1'),
+                (b'cookie', b'b=2'),
+            ],
+        }, b'body')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['wsgi.input'].read(), b'body')
+
+    def test_streaming_response_stays_in_one_thread(self):
+        """Потоковый ответ перебирается и закрывается в одном потоке."""
+        threads = []
+
+        def chunks():
+            for number in range(40):
+                threads.append(threading.get_ident())
+                yield f'{number};'
+
+        class Response(StreamingHttpResponse):
+            def close(self):
+                threads.append(threading.get_ident())
+                super().close()
+
+        response = Response(chunks())
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        application = AsgiHandler(max_workers=4)
+        asyncio.run(application.stream(response, send))
+        application.executor.shutdown()
+        self.assertEqual(len(set(threads)), 1)
+        self.assertEqual(len(threads), 41)
+        self.assertEqual(
+            b''.join(message['body'] for message in sent),
+            ''.join(f'{number};' for number in range(40)).encode(),
+        )
+
+
+class AsgiUnicodePathTests(TransactionTestCase):
+    def test_cyrillic_profile_url(self):
+        """Путь не из latin-1 доходит до представления целиком."""
+        User.objects.create_user(username='Иван')
+        application = AsgiHandler(max_workers=1)
+        # В ASGI scope путь приходит уже раскодированным из %XX.
+        sent = call(application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': unquote(reverse('posts:profile', args=['Иван'])),
+            'headers': [(b'host', b'testserver')],
+        })
+        application.executor.shutdown()
+        self.assertEqual(sent[0]['status'], 200)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Иван'.encode(), body)
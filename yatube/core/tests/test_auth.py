@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import auth
+
+User = get_user_model()
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        auth.local_users().clear()
+        # Тестовый LocMemCache изображает общий кеш.
+        patcher = mock.patch.object(
+            auth, 'is_shared_cache', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(
+            username='leo_tolstoy', password='old-password-42')
+        self.client.force_login(self.user)
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        queries = [
+            query['sql'] for query in captured
+            if 'FROM "auth_user"' in query['sql']
+        ]
+        return response, queries
+
+    def test_user_is_read_from_cache(self):
+        """На повторных запросах вошедшего пользователя нет SELECT."""
+        url = reverse('about:author')
+        self.assertEqual(len(self.user_queries(url)[1]), 1)
+        response, queries = self.user_queries(url)
+        self.assertEqual(queries, [])
+        self.assertContains(response, 'leo_tolstoy')
+        auth.local_users().clear()
+        self.assertEqual(self.user_queries(url)[1], [])
+
+    def test_process_local_cache_is_not_shared(self):
+        """С LocMemCache после LRU снимок читается из БД."""
+        url = reverse('about:author')
+        self.client.get(url)
+        auth.local_users().clear()
+        with mock.patch.object(auth, 'is_shared_cache', return_value=False):
+            self.assertEqual(len(self.user_queries(url)[1]), 1)
+
+    def test_late_snapshot_is_not_served(self):
+        """Снимок, прочитанный до сброса, не попадает в общий кеш."""
+        stale = auth.make_snapshot(self.user)
+        generation = auth.get_generation(cache, self.user.pk)
+        auth.invalidate(self.user.pk)
+        key = f'{auth.snapshot_key(self.user.pk)}:{generation}'
+        cache.add(key, stale)
+        self.assertNotEqual(
+            auth.get_generation(cache, self.user.pk), generation)
+        auth.local_users().clear()
+        url = reverse('about:author')
+        self.assertEqual(len(self.user_queries(url)[1]), 1)
+
+    @override_settings(AUTH_USER_CACHE={
+        'CACHE': 'default', 'TIMEOUT': 60,
+        'LOCAL_SIZE': 1, 'LOCAL_TIMEOUT': 60,
+    })
+    def test_local_cache_follows_settings(self):
+        self.assertEqual(auth.local_users().max_size, 1)
+
+    def test_admin_edit_is_visible_at_once(self):
+        url = reverse('about:author')
+        self.client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        self.assertContains(self.client.get(url), 'renamed')
+
+    def test_password_change_logs_out_other_sessions(self):
+        other = Client()
+        other.force_login(self.user)
+        url = reverse('posts:follow_index')
+        self.assertEqual(other.get(url).status_code, 200)
+        response = self.client.post(
+            reverse('users:password_change_form'),
+            {
+                'old_password': 'old-password-42',
+                'new_password1': 'new-password-42',
+                'new_password2': 'new-password-42',
+            },
+        )
+        self.assertRedirects(
+            response, reverse('users:password_change_done'))
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(other.get(url).status_code, 302)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(user.check_password('new-password-42'))
+        self.assertEqual(user.username, 'leo_tolstoy')
+
+    def test_logout_drops_snapshot(self):
+        self.client.get(reverse('about:author'))
+        key = auth.snapshot_key(self.user.pk)
+        generation = auth.get_generation(cache, self.user.pk)
+        self.assertIsNotNone(cache.get(f'{key}:{generation}'))
+        self.client.get(reverse('users:logout'))
+        self.assertNotEqual(
+            auth.get_generation(cache, self.user.pk), generation)
+        self.assertIsNone(auth.local_users().get(key))
+
+
+class LRUCacheTests(TestCase):
+    def test_least_recently_used_is_evicted(self):
+        lru = auth.LRUCache(max_size=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual((lru.get('a'), lru.get('b')), (1, None))
+
+    def test_expired_item_is_missing(self):
+        lru = auth.LRUCache(max_size=2, timeout=-1)
+        lru.set('a', 1)
+        self.assertIsNone(lru.get('a'))
@@ -0,0 +1,59 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from ..db_routers import ReplicaRouter, current_replica, read_from_replica
+from ..middleware import ReplicaRoutingMiddleware
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(current_replica())
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+        self.view = view
+
+    def request(self, method, url, cookies=None):
+        request = getattr(RequestFactory(), method)(url)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(url)
+
+        def get_response(request):
+            self.middleware.process_view(request, self.view, (), {})
+            return self.view(request)
+
+        self.middleware.get_response = get_response
+        return self.middleware(request)
+
+    def test_router_reads_replica_only_inside_block(self):
+        self.assertIsNone(self.router.db_for_read(Post))
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Post), 'replica1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_only_feed_views_use_replica(self):
+        """Ленты читают из реплики, форма создания поста — нет."""
+        self.request('get', reverse('posts:index'))
+        self.request('get', reverse('posts:post_create'))
+        self.assertEqual(self.seen, ['replica1', None])
+        self.assertIsNone(current_replica())
+
+    def test_write_makes_reads_sticky_to_primary(self):
+        """После записи пользователь читает свои данные из default."""
+        response = self.request('post', reverse('posts:post_create'))
+        cookie = response.cookies['read_primary'].value
+        self.request(
+            'get', reverse('posts:index'), cookies={'read_primary': cookie}
+        )
+        self.request(
+            'get', reverse('posts:index'), cookies={'read_primary': 'bad'}
+        )
+        self.assertEqual(self.seen, [None, None, 'replica1'])
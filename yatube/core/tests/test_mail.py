@@ -0,0 +1,114 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import mail as queued_mail
+from .. import profiling
+from ..smtp import LocalSMTPServer
+
+User = get_user_model()
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        self.server = LocalSMTPServer().start()
+        self.addCleanup(self.server.stop)
+        overrides = override_settings(
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=self.server.port)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.queue = queued_mail.MailQueue(
+            SMTP_BACKEND, batch_size=10, flush_interval=0, retry_delay=0)
+
+    def send(self, count):
+        connection = queued_mail.QueuedEmailBackend()
+        with mock.patch.object(
+                queued_mail, 'get_queue', return_value=self.queue):
+            for number in range(count):
+                mail.send_mail(
+                    f'Письмо {number}', 'Текст', 'from@yatube.ru',
+                    [f'user{number}@yatube.ru'], connection=connection,
+                )
+
+    def test_messages_are_sent_in_batches(self):
+        self.send(15)
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(self.queue.depth(), 15)
+        self.queue.drain()
+        self.assertEqual(len(self.server.messages), 15)
+        self.assertEqual(self.server.sessions, 2)
+        self.assertEqual(
+            self.server.messages[0]['message']['Subject'], 'Письмо 0')
+
+    def test_temporary_failure_is_retried(self):
+        """Повтор продолжает пачку с неотправленного письма."""
+        self.send(3)
+        self.server.fail_next = 2
+        self.queue.drain()
+        subjects = [
+            envelope['message']['Subject']
+            for envelope in self.server.messages
+        ]
+        self.assertEqual(subjects, ['Письмо 0', 'Письмо 1', 'Письмо 2'])
+        self.assertEqual((self.queue.sent, self.queue.failed), (3, 0))
+
+    def test_message_is_dropped_after_retries(self):
+        self.queue.retries = 1
+        self.send(2)
+        self.server.fail_next = 2
+        with self.assertLogs('core.mail', 'ERROR'):
+            self.queue.drain()
+        self.assertEqual((self.queue.sent, self.queue.failed), (1, 1))
+
+    def test_permanent_failure_is_not_retried(self):
+        """Отказ 550 не повторяется, остальные письма пачки уходят."""
+        self.send(3)
+        self.server.rejected.add('user1@yatube.ru')
+        with mock.patch.object(queued_mail.time, 'sleep') as sleep, \
+                self.assertLogs('core.mail', 'ERROR'):
+            self.queue.drain()
+        sleep.assert_not_called()
+        self.assertEqual((self.queue.sent, self.queue.failed), (2, 1))
+
+    def test_full_queue_sends_once_in_request(self):
+        """Переполненная очередь отправляет письмо сразу, без пауз."""
+        self.queue = queued_mail.MailQueue(SMTP_BACKEND, max_size=1)
+        self.send(1)
+        self.server.fail_next = 1
+        with mock.patch.object(queued_mail.time, 'sleep') as sleep, \
+                self.assertLogs('core.mail', 'ERROR'):
+            self.send(1)
+        sleep.assert_not_called()
+        self.assertEqual(self.queue.failed, 1)
+
+    def test_worker_pool_and_depth_gauge(self):
+        with mock.patch.object(profiling.registry, 'gauges', {}):
+            profiling.registry.gauge('mail_queue_depth', self.queue.depth)
+            self.send(4)
+            gauges = profiling.registry.snapshot()['<gauges>']
+            self.assertEqual(gauges['mail_queue_depth'], 4)
+            self.queue.start()
+            self.queue.stop()
+            self.assertEqual(self.queue.depth(), 0)
+        self.assertEqual(len(self.server.messages), 4)
+
+    @override_settings(EMAIL_BACKEND='core.mail.QueuedEmailBackend')
+    def test_password_reset_does_not_wait_for_mail(self):
+        User.objects.create_user(
+            username='auth', email='auth@yatube.ru', password='secret')
+        with mock.patch.object(
+                queued_mail, 'get_queue', return_value=self.queue):
+            response = self.client.post(
+                reverse('users:password_reset_form'),
+                {'email': 'auth@yatube.ru'},
+            )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(self.server.messages, [])
+        self.queue.drain()
+        self.assertEqual(
+            self.server.messages[0]['message']['To'], 'auth@yatube.ru')
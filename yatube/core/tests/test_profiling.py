@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+
+User = get_user_model()
+
+
+@override_settings(PROFILING={
+    'ENABLED': True, 'SAMPLE_RATE': 1.0, 'PROFILE_LIMIT': 5,
+})
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='auth')
+
+    def setUp(self):
+        profiling.registry.reset()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_stats_grouped_by_view_name(self):
+        """Запросы учитываются по имени представления."""
+        self.client.get(reverse('posts:profile', args=[self.user.username]))
+        self.client.get(reverse('about:tech'))
+        stats = self.staff_client.get(reverse('core:profiling')).json()
+        profile = stats['posts:profile']
+        self.assertEqual(profile['requests'], 1)
+        self.assertGreater(profile['sql_queries_avg'], 0)
+        self.assertGreater(profile['template']['avg_ms'], 0)
+        self.assertEqual(len(profile['profiles']), 1)
+        self.assertEqual(stats['about:tech']['sql_queries_avg'], 0)
+
+    def test_stats_are_staff_only(self):
+        """Не сотрудник не видит статистику."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('core:profiling'))
+        self.assertEqual(response.status_code, 302)
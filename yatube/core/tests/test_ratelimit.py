@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import ratelimit
+
+User = get_user_model()
+
+RATELIMIT = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'METHODS': ('POST',),
+    'VIEWS': {
+        'users:login': {'ip': '2/m'},
+        'posts:post_create': {'user': '1/m', 'global': '3/m'},
+    },
+}
+
+
+class SlidingWindowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(3):
+            self.assertEqual(ratelimit.hit(cache, 'key', 3, 60, now=60), 0)
+        self.assertEqual(ratelimit.hit(cache, 'key', 3, 60, now=90), 30)
+        # Половина прошлого окна: 4 * 0.5 + 1 <= 3.
+        self.assertEqual(ratelimit.hit(cache, 'key', 3, 60, now=150), 0)
+        self.assertGreater(ratelimit.hit(cache, 'key', 3, 60, now=150), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate('5/h'), (5, 3600))
+
+
+@override_settings(RATELIMIT=RATELIMIT)
+class RateLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_ip_limit_returns_429(self):
+        url = reverse('users:login')
+        data = {'username': 'nobody', 'password': 'wrong'}
+        for _ in range(2):
+            self.assertEqual(self.client.post(url, data).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        other = Client(REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(other.post(url, data).status_code, 200)
+
+    def test_user_limit_does_not_spend_global(self):
+        url = reverse('posts:post_create')
+        clients = []
+        for name in ('first', 'second', 'third', 'fourth'):
+            client = Client()
+            client.force_login(User.objects.create_user(username=name))
+            clients.append(client)
+        first = clients[0]
+        self.assertEqual(first.post(url, {'text': 'Пост'}).status_code, 302)
+        for _ in range(3):
+            response = first.post(url, {'text': 'Пост'})
+            self.assertEqual(response.status_code, 429)
+        for client in clients[1:3]:
+            response = client.post(url, {'text': 'Пост'})
+            self.assertEqual(response.status_code, 302)
+        response = clients[3].post(url, {'text': 'Пост'})
+        self.assertEqual(response.status_code, 429)
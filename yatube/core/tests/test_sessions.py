@@ -0,0 +1,97 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..checks import check_session_cache
+from ..middleware import ACTIVITY_SESSION_KEY
+
+User = get_user_model()
+
+DB_ENGINE = 'django.contrib.sessions.backends.db'
+CACHED_DB_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+@override_settings(SESSION_ENGINE=DB_ENGINE)
+class SessionActivityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user(username='auth'))
+
+    def session_writes(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('posts:index'))
+        return [
+            query['sql'] for query in captured
+            if query['sql'].startswith('UPDATE "django_session"')
+        ]
+
+    @override_settings(SESSION_ACTIVITY_INTERVAL=300)
+    def test_activity_writes_are_coalesced(self):
+        self.assertEqual(len(self.session_writes()), 1)
+        self.assertIn(ACTIVITY_SESSION_KEY, self.client.session)
+        self.assertEqual(self.session_writes(), [])
+
+    @override_settings(SESSION_ACTIVITY_INTERVAL=0)
+    def test_zero_interval_writes_every_request(self):
+        self.assertEqual(len(self.session_writes()), 1)
+        self.assertEqual(len(self.session_writes()), 1)
+
+    def test_anonymous_session_is_untouched(self):
+        self.client.logout()
+        self.assertEqual(self.session_writes(), [])
+
+
+class PruneSessionsTests(TestCase):
+    @override_settings(SESSION_ENGINE=DB_ENGINE)
+    def test_expired_sessions_are_deleted_in_batches(self):
+        now = timezone.now()
+        for number in range(7):
+            Session.objects.create(
+                session_key=f'key{number}',
+                session_data='',
+                expire_date=now + timedelta(days=1 if number < 2 else -1),
+            )
+        out = StringIO()
+        call_command('prune_sessions', batch_size=2, stdout=out)
+        self.assertIn('Удалено сессий: 5', out.getvalue())
+        self.assertEqual(
+            set(Session.objects.values_list('session_key', flat=True)),
+            {'key0', 'key1'},
+        )
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_have_nothing_to_prune(self):
+        out = StringIO()
+        call_command('prune_sessions', stdout=out)
+        self.assertIn('не хранит сессии в БД', out.getvalue())
+
+
+class SessionCacheCheckTests(SimpleTestCase):
+    @override_settings(SESSION_ENGINE=CACHED_DB_ENGINE)
+    def test_cached_db_needs_shared_cache(self):
+        errors = check_session_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+
+    @override_settings(
+        SESSION_ENGINE=CACHED_DB_ENGINE,
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.'
+                       'MemcachedCache',
+        }},
+    )
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_session_cache(None), [])
+
+    def test_default_tier_is_db(self):
+        self.assertEqual(settings.SESSION_ENGINE, DB_ENGINE)
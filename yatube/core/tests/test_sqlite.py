@@ -0,0 +1,19 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+
+@override_settings(
+    SQLITE_PRAGMAS={'synchronous': 'NORMAL', 'busy_timeout': 1234}
+)
+class SqlitePragmasTests(TestCase):
+    def test_new_connection_gets_pragmas(self):
+        """Прагмы профиля применяются к каждому новому соединению."""
+        fresh = connection.copy()
+        try:
+            with fresh.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1)
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 1234)
+        finally:
+            fresh.close()
@@ -0,0 +1,70 @@
+from django.template import engines
+from django.template.loader_tags import IncludeNode
+from django.test import TestCase, override_settings
+
+from ..template_loaders import Loader
+
+LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class InliningLoaderTests(TestCase):
+    def setUp(self):
+        self.loader = Loader(engines['django'].engine, LOADERS)
+
+    def get_source(self, template_name):
+        origin = next(self.loader.get_template_sources(template_name))
+        return self.loader.get_contents(origin)
+
+    def test_static_include_is_inlined(self):
+        """Пагинатор подставляется в список постов."""
+        source = self.get_source('includes/post_list.html')
+        self.assertNotIn("include 'includes/paginator.html'", source)
+        self.assertIn('{# templates/posts/includes/paginator.html #}', source)
+
+    def test_post_list_renders_cards_without_include(self):
+        """Карточки списка постов идут через post_cards, а не include."""
+        source = self.get_source('includes/post_list.html')
+        self.assertIn('{% post_cards page_obj stats as cards %}', source)
+        self.assertNotIn('<article>', source)
+
+    def test_search_card_is_inlined(self):
+        """Карточка поста подставляется в страницу поиска."""
+        source = self.get_source('posts/search.html')
+        self.assertNotIn("include 'includes/post_card.html'", source)
+        self.assertIn('<article>', source)
+
+    def test_include_with_arguments_becomes_with_block(self):
+        """Аргументы include сохраняются через {% with %}."""
+        source = self.get_source('posts/search.html')
+        self.assertIn("{% with stats='index' %}<article>", source)
+
+    @override_settings(TEMPLATE_INLINE_INCLUDES=())
+    def test_other_includes_are_kept(self):
+        """Шаблоны вне TEMPLATE_INLINE_INCLUDES не подставляются."""
+        source = self.get_source('includes/post_list.html')
+        self.assertIn("{% include 'includes/paginator.html' %}", source)
+        source = self.get_source('posts/search.html')
+        self.assertIn(
+            "{% include 'includes/post_card.html' with stats='index' %}",
+            source,
+        )
+
+
+class ConfiguredEngineTests(TestCase):
+    def included(self, template_name):
+        template = engines['django'].engine.get_template(template_name)
+        return [
+            node.template.var
+            for node in template.nodelist.get_nodes_by_type(IncludeNode)
+        ]
+
+    def test_engine_inlines_static_includes(self):
+        """Движок из настроек, с cached.Loader, тоже подставляет include."""
+        self.assertNotIn(
+            'includes/paginator.html',
+            self.included('includes/post_list.html'),
+        )
+        self.assertEqual(self.included('posts/search.html'), [])
@@ -0,0 +1,13 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from . import profiling
+
+
+@staff_member_required
+def profiling_stats(request):
+    """Агрегаты ProfilingMiddleware этого процесса в JSON."""
+    return JsonResponse(
+        profiling.registry.snapshot(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
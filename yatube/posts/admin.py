@@ -21,6 +21,7 @@ class GroupAdmin(admin.ModelAdmin):
         'pk',
         'title',
         'description',
+        'posts_count',
     )
     search_fields = ('title', 'description',)
     empty_value_display = '-пусто-'
@@ -0,0 +1,297 @@
+import json
+from functools import wraps
+
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from .directory import group_directory_page
+from .models import Group, Post, User, get_posts_count
+from .paginators import KeysetPage, KeysetPaginator, encode_cursor
+from .views import GROUPS_ON_PAGE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+
+# Поля ресурсов: имя в ответе → колонка в values().
+POST_FIELDS = {
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'version': 'version',
+    'author': 'author_id',
+    'group': 'group_id',
+}
+AUTHOR_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+}
+GROUP_FIELDS = {
+    'slug': 'slug',
+    'title': 'title',
+    'description': 'description',
+    'posts_count': 'posts_count',
+}
+# Связи поста, которые можно подгрузить через include=.
+INCLUDES = {
+    'author': (User, AUTHOR_FIELDS),
+    'group': (Group, GROUP_FIELDS),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def dumps(data):
+    """JSON в байтах: orjson, если установлен, иначе стандартный json.
+
+    Даты оба варианта пишут одинаково, в isoformat().
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, ensure_ascii=False, separators=(',', ':'),
+        default=lambda value: value.isoformat(),
+    ).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        dumps(data), status=status, content_type='application/json'
+    )
+
+
+def api_view(view):
+    """Только GET; ошибки отдаются в JSON, а не HTML-страницей."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return json_response(view(request, *args, **kwargs))
+        except Http404:
+            return json_response({'error': 'Не найдено.'}, status=404)
+        except ApiError as error:
+            return json_response({'error': error.message}, error.status)
+    return wrapper
+
+
+def parse_list(request, name, allowed):
+    """Список через запятую из GET; неизвестное имя — ошибка 400."""
+    raw = request.GET.get(name)
+    if raw is None:
+        return None
+    names = [item for item in raw.split(',') if item]
+    unknown = set(names) - set(allowed)
+    if unknown:
+        raise ApiError(
+            400, f'{name}: неизвестные поля {", ".join(sorted(unknown))}.'
+        )
+    return names
+
+
+def parse_fields(request, resource, allowed):
+    """fields= для основного ресурса, fields[author]= и т. п. — для
+    подгружаемых. Без параметра отдаются все поля."""
+    key = 'fields' if resource is None else f'fields[{resource}]'
+    names = parse_list(request, key, allowed)
+    return list(allowed) if names is None else names
+
+
+def parse_page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError(400, 'limit: нужно целое число.')
+    return max(1, min(size, API_MAX_PAGE_SIZE))
+
+
+def project(row, fields, columns):
+    """Строка values() → объект ответа только с запрошенными полями."""
+    data = {'id': row['id']}
+    for name in fields:
+        data[name] = row[columns[name]]
+    return data
+
+
+def load_included(request, rows, include):
+    """Связанные объекты страницы: по одному запросу на связь.
+
+    Вместо JOIN в запросе постов — выборка по уникальным id, так что
+    автор десяти постов страницы читается и сериализуется один раз.
+    """
+    included = {}
+    for name in include:
+        model, columns = INCLUDES[name]
+        fields = parse_fields(request, name, columns)
+        ids = {row[POST_FIELDS[name]] for row in rows} - {None}
+        objects = model.objects.filter(pk__in=ids).order_by('pk').values(
+            'id', *(columns[field] for field in fields)
+        ) if ids else ()
+        included[name] = [
+            project(row, fields, columns) for row in objects
+        ]
+    return included
+
+
+def post_columns(fields, include):
+    """Колонки запроса постов: запрошенные, ключ курсора и связи."""
+    columns = {'id', 'pub_date'}
+    columns.update(POST_FIELDS[name] for name in fields)
+    columns.update(POST_FIELDS[name] for name in include)
+    return sorted(columns)
+
+
+def serialize_posts(request, rows, fields, include):
+    data = {'data': [project(row, fields, POST_FIELDS) for row in rows]}
+    if include:
+        data['included'] = load_included(request, rows, include)
+    return data
+
+
+def page_links(request, page):
+    links = {}
+    for name, cursor in (
+        ('next', page.next_cursor), ('previous', page.previous_cursor),
+    ):
+        if cursor is None:
+            links[name] = None
+            continue
+        params = request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params['after' if name == 'next' else 'before'] = cursor
+        links[name] = f'{request.path}?{params.urlencode()}'
+    return links
+
+
+class RowPage(KeysetPage):
+    """Страница строк values(): курсор берётся из словаря."""
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next() and self.object_list):
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last['pub_date'], last['id'])
+
+    @property
+    def previous_cursor(self):
+        if not (self.has_previous() and self.object_list):
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first['pub_date'], first['id'])
+
+
+class RowPaginator(KeysetPaginator):
+    page_class = RowPage
+
+
+def posts_page(request, post_list):
+    """Страница постов с fields=, include= и курсорами after/before.
+
+    Посты читаются через values(), без создания моделей: ответу нужны
+    только колонки, а не методы и связи объектов.
+    """
+    fields = parse_fields(request, None, POST_FIELDS)
+    include = parse_list(request, 'include', INCLUDES) or []
+    paginator = RowPaginator(
+        post_list.values(*post_columns(fields, include)),
+        parse_page_size(request),
+    )
+    page = paginator.page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    data = serialize_posts(request, page.object_list, fields, include)
+    data['links'] = page_links(request, page)
+    return data
+
+
+@api_view
+def post_list(request):
+    return posts_page(request, Post.objects.all())
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = parse_fields(request, None, POST_FIELDS)
+    include = parse_list(request, 'include', INCLUDES) or []
+    row = Post.objects.filter(pk=post_id).values(
+        *post_columns(fields, include)
+    ).first()
+    if row is None:
+        raise Http404
+    data = serialize_posts(request, [row], fields, include)
+    data['data'] = data['data'][0]
+    return data
+
+
+@api_view
+def group_list(request):
+    """Каталог групп из того же кеша, что и страница «Группы»."""
+    page = group_directory_page(
+        GROUPS_ON_PAGE,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return {
+        'data': [
+            {
+                'slug': row['slug'],
+                'title': row['title'],
+                'posts_count': row['posts_count'],
+                'latest': row['latest'],
+            }
+            for row in page.object_list
+        ],
+        'links': page_links(request, page),
+    }
+
+
+@api_view
+def group_detail(request, slug):
+    fields = parse_fields(request, None, GROUP_FIELDS)
+    group = Group.objects.filter(slug=slug).values(
+        'id', *(GROUP_FIELDS[name] for name in fields)
+    ).first()
+    if group is None:
+        raise Http404
+    return {'data': project(group, fields, GROUP_FIELDS)}
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return posts_page(request, group.post.all())
+
+
+@api_view
+def profile_detail(request, username):
+    fields = parse_fields(
+        request, None, {**AUTHOR_FIELDS, 'posts_count': None}
+    )
+    author = get_object_or_404(
+        User.objects.select_related('post_stats'), username=username
+    )
+    data = {'id': author.pk}
+    for name in fields:
+        if name == 'posts_count':
+            data[name] = get_posts_count(author)
+        else:
+            data[name] = getattr(author, AUTHOR_FIELDS[name])
+    return {'data': data}
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return posts_page(request, author.post.all())
@@ -0,0 +1,176 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.translation import get_language
+
+from core import profiling
+
+from .paginators import decode_cursor, encode_cursor
+
+INDEX_FEED_PREFIX = 'index_feed'
+# Меняется при появлении и удалении постов: сдвигает все страницы
+# с номерами, первую страницу и страницы ?before=.
+INDEX_GENERATION_KEY = f'{INDEX_FEED_PREFIX}:generation'
+# Меняется при правке групп и авторов, чьи имена показаны в карточках.
+INDEX_RELATED_KEY = f'{INDEX_FEED_PREFIX}:related'
+# Меняется при любом изменении постов, по ней строится ETag главной.
+INDEX_CHANGES_KEY = f'{INDEX_FEED_PREFIX}:changes'
+POST_CARD_PREFIX = 'post_card'
+POST_CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def feed_cache():
+    return caches[settings.POSTS_FEED_CACHE]
+
+
+def post_token_key(pk):
+    return f'{INDEX_FEED_PREFIX}:post:{pk}'
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def get_tokens(keys):
+    """Текущие метки ключей; недостающие создаются заново.
+
+    Новая метка никогда не совпадает со старой, поэтому вытеснение
+    метки из кеша делает зависящие от неё страницы промахом, а не
+    устаревшим попаданием.
+    """
+    cache = feed_cache()
+    tokens = cache.get_many(keys)
+    missing = {key: new_token() for key in keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, None)
+        tokens.update(missing)
+    return tokens
+
+
+def index_page_key(request):
+    """Ключ страницы главной ленты по номеру страницы или курсору.
+
+    Курсоры в ключ попадают разобранными и упакованными заново, как их
+    понимает KeysetPaginator: испорченный курсор открывает первую
+    страницу и делит с ней ключ, а не плодит новые записи в кеше.
+    """
+    tokens = get_tokens([INDEX_GENERATION_KEY, INDEX_RELATED_KEY])
+    prefix = f'{INDEX_FEED_PREFIX}:{tokens[INDEX_RELATED_KEY]}'
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    before_key = decode_cursor(before)
+    after_key = decode_cursor(after)
+    if before_key is None and after_key is not None:
+        # Новые посты всегда свежее курсора и на такие страницы
+        # не попадают, поэтому поколение в ключ не входит.
+        return f'{prefix}:after:{encode_cursor(*after_key)}'
+    prefix = f'{prefix}:{tokens[INDEX_GENERATION_KEY]}'
+    if before_key is not None:
+        return f'{prefix}:before:{encode_cursor(*before_key)}'
+    if settings.POSTS_PAGINATION == 'keyset' or after or before:
+        return f'{prefix}:first'
+    page = request.GET.get('page', '1')
+    if not page.isdigit():
+        page = '1'
+    return f'{prefix}:page:{int(page)}'
+
+
+def cached_index_feed(request, page_obj):
+    """HTML списка постов главной страницы из кеша или свежий.
+
+    Вместе с HTML хранятся метки показанных постов; правка поста
+    меняет его метку, и страницы с ним перестают совпадать.
+    """
+    cache = feed_cache()
+    key = index_page_key(request)
+    entry = cache.get(key)
+    if entry is not None:
+        current = cache.get_many(list(entry['tokens']))
+        if current == entry['tokens']:
+            return entry['html']
+    html = render_to_string(
+        'includes/post_list.html',
+        {'page_obj': page_obj, 'stats': 'index'},
+        request,
+    )
+    tokens = get_tokens([post_token_key(post.pk) for post in page_obj])
+    cache.set(
+        key,
+        {'html': html, 'tokens': tokens},
+        settings.POSTS_FEED_CACHE_TIMEOUT,
+    )
+    return html
+
+
+def invalidate_post(pk, shifts_feed=False):
+    """Сбрасывает закешированные страницы ленты с постом pk.
+
+    shifts_feed — пост появился или исчез, и страницы с номерами
+    сдвинулись целиком.
+    """
+    keys = [post_token_key(pk), INDEX_CHANGES_KEY]
+    if shifts_feed:
+        keys.append(INDEX_GENERATION_KEY)
+    feed_cache().delete_many(keys)
+
+
+def invalidate_index_feed():
+    """Сбрасывает все страницы главной ленты."""
+    feed_cache().delete(INDEX_RELATED_KEY)
+
+
+def version_key(*objects):
+    """Часть ключа кеша из версий объектов, от которых зависит фрагмент.
+
+    Правка объекта увеличивает его version, и фрагмент со старым
+    ключом просто перестаёт запрашиваться: сбрасывать ничего не нужно.
+    None (например, пост без группы) тоже входит в ключ.
+    """
+    return '|'.join(
+        '-' if obj is None
+        else f'{obj._meta.label_lower}:{obj.pk}:{obj.version}'
+        for obj in objects
+    )
+
+
+def post_card_key(post, stats):
+    """Ключ карточки: всё, что показано в ней для варианта stats.
+
+    Лента группы не загружает группы постов, лента автора — авторов,
+    поэтому в ключ входит только то, что карточка действительно
+    выводит. У пользователей нет версии, их имена входят в ключ хешем.
+    """
+    parts = [stats, get_language(), version_key(post)]
+    if stats != 'group_list':
+        parts.append(version_key(post.group) if post.group_id else '-')
+    if stats != 'profile':
+        author = post.author
+        parts.append(hashlib.md5(
+            f'{author.username}|{author.get_full_name()}'.encode()
+        ).hexdigest())
+    return f'{POST_CARD_PREFIX}:' + ':'.join(parts)
+
+
+def render_post_cards(posts, stats, context):
+    """HTML карточек постов по порядку.
+
+    Готовые карточки читаются одним get_many, недостающие рендерятся
+    и сохраняются одним set_many.
+    """
+    cache = feed_cache()
+    keys = [post_card_key(post, stats) for post in posts]
+    cards = cache.get_many(keys)
+    profiling.count('post_card_hits', len(cards))
+    profiling.count('post_card_misses', len(keys) - len(cards))
+    missing = {}
+    template = context.template.engine.get_template(POST_CARD_TEMPLATE)
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            with context.push(post=post, stats=stats):
+                missing[key] = cards[key] = template.render(context)
+    if missing:
+        cache.set_many(missing, settings.POSTS_FEED_CACHE_TIMEOUT)
+    return [cards[key] for key in keys]
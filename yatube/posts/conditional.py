@@ -0,0 +1,113 @@
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cache, ingest
+from .models import Group, Post, User
+
+
+def make_etag(request, *parts):
+    """ETag страницы из версий данных, пользователя и параметров.
+
+    Шапка страницы зависит от пользователя, а лента — от номера
+    страницы или курсора, поэтому они тоже входят в ETag. Метка
+    INDEX_RELATED_KEY меняется при правке авторов и групп, чьи имена
+    показаны в карточках.
+    """
+    related = cache.get_tokens([cache.INDEX_RELATED_KEY])
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    raw = '|'.join(str(part) for part in (
+        *parts,
+        related[cache.INDEX_RELATED_KEY],
+        user_id,
+        request.GET.urlencode(),
+    ))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def index_etag(request):
+    # Без запросов к БД: закешированная главная тоже обходится без них.
+    changes = cache.get_tokens([cache.INDEX_CHANGES_KEY])
+    return make_etag(request, changes[cache.INDEX_CHANGES_KEY])
+
+
+def latest_update(**filters):
+    """Подзапрос: updated_at последнего изменённого поста.
+
+    Читает одну строку индекса (author или group, updated_at), а не
+    агрегирует все посты автора или группы.
+    """
+    return Subquery(
+        Post.objects.filter(**filters).order_by(
+            '-updated_at'
+        ).values('updated_at')[:1]
+    )
+
+
+def group_state(slug):
+    """(posts_count, последний updated_at) группы или None."""
+    return Group.objects.filter(slug=slug).annotate(
+        latest=latest_update(group=OuterRef('pk'))
+    ).values_list('posts_count', 'latest').first()
+
+
+def author_state(username):
+    """(posts_count, followers_count, последний updated_at) автора."""
+    counters = ('post_stats__posts_count', 'post_stats__followers_count')
+    return User.objects.filter(username=username).annotate(
+        latest=latest_update(author=OuterRef('pk'))
+    ).values_list(*counters, 'latest').first()
+
+
+def group_etag(request, slug):
+    state = group_state(slug)
+    if state is None:
+        return None
+    return make_etag(request, 'group', slug, *state)
+
+
+def profile_etag(request, username):
+    # followers_count меняет кнопку подписки у любого читателя.
+    state = author_state(username)
+    if state is None:
+        return None
+    # Автор видит свои посты из очереди отложенной записи.
+    pending = ''
+    if request.user.is_authenticated and request.user.username == username:
+        pending = len(ingest.pending_posts(request.user))
+    return make_etag(request, 'profile', username, *state, pending)
+
+
+def post_detail_etag(request, post_id):
+    state = Post.objects.filter(pk=post_id).values_list(
+        'updated_at', 'author__post_stats__posts_count'
+    ).first()
+    if state is None:
+        return None
+    return make_etag(request, 'post', post_id, *state)
+
+
+def conditional_page(etag_func):
+    """Отвечает 304 по If-None-Match до вызова представления.
+
+    Браузеры и CDN должны перепроверять страницу при каждом показе
+    (no-cache), страницы пользователей — только в своём кеше (private).
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
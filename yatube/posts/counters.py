@@ -0,0 +1,52 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .directory import invalidate_group_directory
+from .models import AuthorStats, Follow, Group, Post
+
+
+def rebuild_post_counters(batch_size=1000):
+    """Пересчитывает счётчики постов и подписчиков авторов и постов групп.
+
+    Нужен после bulk_create и других массовых операций, которые
+    обходят сигналы моделей Post и Follow.
+    """
+    group_counts = (
+        Post.objects.filter(group=OuterRef('pk'))
+        .order_by()
+        .values('group')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    author_counts = (
+        Post.objects.order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .values_list('author', 'total')
+    )
+    follower_counts = dict(
+        Follow.objects.order_by()
+        .values('author')
+        .annotate(total=Count('pk'))
+        .values_list('author', 'total')
+    )
+    with transaction.atomic():
+        Group.objects.update(
+            posts_count=Coalesce(Subquery(group_counts), 0)
+        )
+        AuthorStats.objects.all().delete()
+        post_counts = dict(author_counts.iterator())
+        AuthorStats.objects.bulk_create(
+            (
+                AuthorStats(
+                    author_id=author_id,
+                    posts_count=post_counts.get(author_id, 0),
+                    followers_count=follower_counts.get(author_id, 0),
+                )
+                for author_id in post_counts.keys() | follower_counts.keys()
+            ),
+            batch_size=batch_size,
+        )
+    # Каталог групп показывает posts_count: его страницы устарели.
+    invalidate_group_directory()
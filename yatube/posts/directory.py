@@ -0,0 +1,76 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from . import cache
+from .models import Group, Post
+from .paginators import KeysetPage
+
+GROUP_DIRECTORY_KEY = 'group_directory'
+
+
+class GroupPage(KeysetPage):
+    """Страница каталога групп; курсор — slug крайней группы."""
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next() and self.object_list):
+            return None
+        return self.object_list[-1]['slug']
+
+    @property
+    def previous_cursor(self):
+        if not (self.has_previous() and self.object_list):
+            return None
+        return self.object_list[0]['slug']
+
+
+def query_groups(per_page, after=None, before=None):
+    """Группы со счётчиком постов и датой последнего поста.
+
+    Один запрос: количество берётся из Group.posts_count, дата —
+    подзапросом по индексу (group, pub_date, id), по строке на группу.
+    """
+    latest = Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date', '-pk'
+    ).values('pub_date')[:1]
+    groups = Group.objects.annotate(latest=Subquery(latest)).values(
+        'slug', 'title', 'posts_count', 'latest'
+    )
+    limit = per_page + 1
+    if before:
+        rows = list(groups.filter(slug__lt=before).order_by('-slug')[:limit])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        return rows, bool(rows), has_previous
+    if after:
+        groups = groups.filter(slug__gt=after)
+    rows = list(groups.order_by('slug')[:limit])
+    return rows[:per_page], len(rows) > per_page, bool(after)
+
+
+def group_directory_page(per_page, after=None, before=None):
+    """Страница каталога групп из кеша или из базы.
+
+    Страницы хранятся под меткой GROUP_DIRECTORY_KEY, которую меняют
+    появление и удаление постов и правка групп.
+    """
+    feed_cache = cache.feed_cache()
+    token = cache.get_tokens([GROUP_DIRECTORY_KEY])[GROUP_DIRECTORY_KEY]
+    if before:
+        position = f'before:{before}'
+    else:
+        position = f'after:{after or ""}'
+    position = hashlib.md5(position.encode()).hexdigest()
+    key = f'{GROUP_DIRECTORY_KEY}:{token}:{per_page}:{position}'
+    page = feed_cache.get(key)
+    if page is None:
+        page = query_groups(per_page, after=after, before=before)
+        feed_cache.set(key, page, settings.POSTS_FEED_CACHE_TIMEOUT)
+    rows, has_next, has_previous = page
+    return GroupPage(rows, None, has_next, has_previous)
+
+
+def invalidate_group_directory():
+    cache.feed_cache().delete(GROUP_DIRECTORY_KEY)
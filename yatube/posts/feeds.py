@@ -0,0 +1,146 @@
+import hashlib
+import io
+from itertools import chain
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import feedgenerator, timezone
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from . import cache
+from .conditional import author_state, group_state
+from .models import Post
+
+FEED_FORMATS = {
+    'rss': feedgenerator.Rss201rev2Feed,
+    'atom': feedgenerator.Atom1Feed,
+}
+FEED_ITEM_FIELDS = (
+    'text', 'pub_date', 'updated_at',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+FEED_CACHE_PREFIX = 'syndication'
+
+
+def feed_etag(request, fmt, slug=None, username=None):
+    """ETag ленты: не зависит от пользователя, только от данных.
+
+    Общая лента проверяется по меткам кеша без запросов к БД, ленты
+    группы и автора — одним запросом по счётчикам и MAX(updated_at).
+    Значение остаётся в request.feed_etag и служит ключом кеша ленты.
+    """
+    request.feed_etag = None
+    if fmt not in FEED_FORMATS:
+        return None
+    keys = [cache.INDEX_RELATED_KEY]
+    if slug is not None:
+        state = group_state(slug)
+    elif username is not None:
+        state = author_state(username)
+    else:
+        keys.append(cache.INDEX_CHANGES_KEY)
+        state = ()
+    if state is None:
+        return None
+    tokens = cache.get_tokens(keys)
+    raw = '|'.join(str(part) for part in (
+        fmt, slug, username, *state, *(tokens[key] for key in keys)
+    ))
+    request.feed_etag = hashlib.md5(raw.encode()).hexdigest()
+    return request.feed_etag
+
+
+def feed_posts(slug=None, username=None):
+    """Последние посты ленты; читаются курсором, без списка в памяти."""
+    posts = Post.objects.select_related('author', 'group').only(
+        *FEED_ITEM_FIELDS
+    )
+    if slug is not None:
+        posts = posts.filter(group__slug=slug)
+    if username is not None:
+        posts = posts.filter(author__username=username)
+    posts = posts.order_by('-pub_date', '-pk')[:settings.POSTS_FEED_ITEMS]
+    return posts.iterator()
+
+
+def drain(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def stream_feed(request, fmt, posts, **feed_kwargs):
+    """Генератор XML ленты: шапка, затем по куску на каждый пост.
+
+    SyndicationFeed.write() собирает все записи в памяти; здесь те же
+    элементы пишутся по одному, сразу как строка прочитана из курсора.
+    """
+    feed = FEED_FORMATS[fmt](
+        language=settings.LANGUAGE_CODE,
+        feed_url=request.build_absolute_uri(),
+        **feed_kwargs
+    )
+    buffer = io.StringIO()
+    handler = SimplerXMLGenerator(buffer, 'utf-8')
+    first = next(posts, None)
+    latest = first.updated_at if first is not None else timezone.now()
+    # Дата свежайшего поста нужна уже в шапке (lastBuildDate, updated).
+    feed.latest_post_date = lambda: latest
+    handler.startDocument()
+    if fmt == 'rss':
+        handler.startElement('rss', feed.rss_attributes())
+        handler.startElement('channel', feed.root_attributes())
+        item_tag = 'item'
+    else:
+        handler.startElement('feed', feed.root_attributes())
+        item_tag = 'entry'
+    feed.add_root_elements(handler)
+    yield drain(buffer)
+    if first is not None:
+        for post in chain([first], posts):
+            handler.startElement(item_tag, {})
+            feed.add_item_elements(handler, make_item(request, feed, post))
+            handler.endElement(item_tag)
+            yield drain(buffer)
+    if fmt == 'rss':
+        feed.endChannelElement(handler)
+        handler.endElement('rss')
+    else:
+        handler.endElement('feed')
+    yield drain(buffer)
+
+
+def make_item(request, feed, post):
+    """Запись ленты; в feed.items она не остаётся."""
+    link = request.build_absolute_uri(
+        reverse('posts:post_detail', args=[post.pk])
+    )
+    author = post.author
+    feed.add_item(
+        title=post.text[:50],
+        link=link,
+        description=post.text,
+        unique_id=link,
+        author_name=author.get_full_name() or author.username,
+        pubdate=post.pub_date,
+        updateddate=post.updated_at,
+        categories=[post.group.title] if post.group_id else None,
+    )
+    return feed.items.pop()
+
+
+def cache_stream(key, chunks):
+    """Отдаёт куски дальше и по окончании кладёт ленту в кеш."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.feed_cache().set(
+        key, ''.join(parts), settings.POSTS_SYNDICATION_CACHE_TIMEOUT
+    )
+
+
+def feed_cache_key(etag):
+    return f'{FEED_CACHE_PREFIX}:{etag}'
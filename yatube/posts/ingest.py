@@ -0,0 +1,396 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import (
+    IntegrityError, close_old_connections, connections, transaction,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_queue = None
+
+# Журнал переписывается, когда очередь пуста и он вырос больше этого.
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+
+class QueueFull(Exception):
+    """Очередь не освободилась за PUT_TIMEOUT секунд."""
+
+
+class Journal:
+    """Файл JSON Lines с принятыми, но ещё не записанными постами.
+
+    Принятый пост — строка {"entry": {...}}, записанная пачка — строка
+    {"done": [ключи]}. После перезапуска посты без отметки done снова
+    ставятся в очередь. Сбой между коммитом пачки и отметкой done
+    запишет её повторно: гарантия «хотя бы один раз».
+
+    Журналом владеет один процесс: чужой процесс переиграл бы его посты
+    и стёр бы их при сжатии. Владение закреплено блокировкой файла
+    {path}.lock, второй процесс с тем же путём не запустится.
+    """
+
+    def __init__(self, path, fsync=False):
+        self.path = path
+        self.fsync = fsync
+        self.lock = self.acquire(f'{path}.lock')
+        self.file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def acquire(path):
+        lock = open(path, 'a')
+        if fcntl is None:
+            return lock
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise ImproperlyConfigured(
+                f'Журнал {path[:-len(".lock")]} уже открыт другим '
+                f'процессом: каждому процессу нужен свой '
+                f'YATUBE_WRITE_BEHIND_JOURNAL.'
+            )
+        return lock
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def unfinished(self):
+        entries = {}
+        with open(self.path, encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Строка, оборванная при аварийной остановке.
+                    continue
+                if 'entry' in record:
+                    entries[record['entry']['key']] = record['entry']
+                for key in record.get('done', ()):
+                    entries.pop(key, None)
+        return list(entries.values())
+
+    def compact(self, entries):
+        """Переписывает журнал, оставляя в нём только entries."""
+        temporary = f'{self.path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as journal:
+            for entry in entries:
+                journal.write(
+                    json.dumps({'entry': entry}, ensure_ascii=False) + '\n'
+                )
+            journal.flush()
+            os.fsync(journal.fileno())
+        self.file.close()
+        os.replace(temporary, self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.file.close()
+        # Закрытие файла снимает и блокировку.
+        self.lock.close()
+
+
+def make_entry(post):
+    return {
+        'key': uuid.uuid4().hex,
+        'author': post.author_id,
+        'group': post.group_id,
+        'text': post.text,
+        'submitted': timezone.now().isoformat(),
+    }
+
+
+def pending_post(entry):
+    """Несохранённый пост для показа автору до записи в базу."""
+    return Post(
+        author_id=entry['author'],
+        group_id=entry['group'],
+        text=entry['text'],
+        pub_date=parse_datetime(entry['submitted']),
+    )
+
+
+class WriteBehindQueue:
+    """Очередь новых постов с записью в базу пачками.
+
+    Каждый пост в SQLite — отдельная транзакция с fsync, и при наплыве
+    писатели ждут друг друга. Здесь поток-писатель сохраняет до
+    batch_size постов в одной транзакции. Пачка пишется через save(),
+    а не bulk_create(): SQLite в Django 2.2 не возвращает id из
+    bulk_create, а счётчики, ленты, поиск и кеш обновляются сигналами
+    post_save.
+
+    Противодавление: принятых, но не записанных постов не больше
+    max_pending; put() ждёт свободного места put_timeout секунд.
+    Надёжность: без журнала очередь живёт только в памяти процесса, с
+    журналом пост до ответа пользователю попадает в файл (с fsync —
+    на диск).
+    """
+
+    def __init__(self, max_pending=1000, put_timeout=2.0, batch_size=100,
+                 flush_interval=0.05, journal=None, journal_fsync=False,
+                 max_attempts=5, retry_delay=1.0):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.capacity = threading.Semaphore(max_pending)
+        self.entries = queue.Queue()
+        self.pending = {}
+        # Посты из журнала, которым не хватило места в capacity.
+        self.uncounted = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.worker = None
+        self.journal = None
+        if journal:
+            self.journal = Journal(journal, fsync=journal_fsync)
+            self.replay()
+
+    def replay(self):
+        entries = self.journal.unfinished()
+        self.journal.compact(entries)
+        for entry in entries:
+            # Восстановленные посты не ждут места: их уже приняли.
+            if not self.capacity.acquire(blocking=False):
+                self.uncounted.add(entry['key'])
+            self.enqueue(entry)
+        if entries:
+            logger.info('Из журнала восстановлено постов: %s', len(entries))
+
+    def enqueue(self, entry):
+        self.pending[entry['key']] = entry
+        self.entries.put(entry)
+
+    def put(self, post):
+        """Принимает несохранённый пост; QueueFull, если мест нет."""
+        if not self.capacity.acquire(timeout=self.put_timeout):
+            raise QueueFull
+        entry = make_entry(post)
+        with self.lock:
+            if self.journal is not None:
+                self.journal.write({'entry': entry})
+            self.enqueue(entry)
+        return entry['key']
+
+    def pending_for(self, author_id):
+        """Посты автора, которые ещё не записаны, от новых к старым."""
+        with self.lock:
+            entries = [
+                entry for entry in self.pending.values()
+                if entry['author'] == author_id
+            ]
+        return [pending_post(entry) for entry in reversed(entries)]
+
+    def take_batch(self, timeout):
+        """Первый пост ждёт до timeout, остальные — flush_interval."""
+        try:
+            batch = [self.entries.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.entries.get(timeout=remaining))
+                else:
+                    batch.append(self.entries.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def write_batch(self, batch):
+        """Записывает пачку; возвращает, сколько постов ждут повтора.
+
+        Что бы ни случилось при записи, пачка проходит через finish():
+        незаписанные посты возвращаются в очередь, места освобождаются.
+        """
+        try:
+            done = self.save_batch(batch)
+        except Exception:
+            logger.exception('Пачка из %s постов не записана', len(batch))
+            done = []
+        return self.finish(batch, done)
+
+    def save_batch(self, batch):
+        """Сохраняет пачку одной транзакцией; возвращает записанные."""
+        try:
+            with transaction.atomic():
+                for entry in batch:
+                    self.save(entry)
+            return batch
+        except Exception:
+            # Не только DatabaseError: упасть может и обработчик
+            # post_save (кеш, поиск). Тогда пишем посты по одному.
+            logger.exception('Пачка из %s постов не записана', len(batch))
+            return [entry for entry in batch if self.write_one(entry)]
+
+    def save(self, entry):
+        Post(
+            author_id=entry['author'],
+            group_id=entry['group'],
+            text=entry['text'],
+        ).save()
+
+    def write_one(self, entry):
+        """Записывает пост отдельно; True, если с ним покончено.
+
+        Пост, который база отвергла (автор удалён), отбрасывается;
+        при любой другой ошибке он вернётся в очередь.
+        """
+        try:
+            with transaction.atomic():
+                self.save(entry)
+        except IntegrityError:
+            logger.exception('Пост %s отброшен', entry['key'])
+        except Exception:
+            logger.exception('Пост %s не записан', entry['key'])
+            return False
+        return True
+
+    def finish(self, batch, done):
+        """Убирает записанные посты, остальные ставит в очередь снова.
+
+        Пост, не записанный max_attempts раз, убирается из очереди; с
+        журналом он останется в файле и будет записан после перезапуска.
+        """
+        done_keys = {entry['key'] for entry in done}
+        retry = []
+        with self.lock:
+            for entry in batch:
+                if entry['key'] not in done_keys:
+                    entry['attempts'] = entry.get('attempts', 0) + 1
+                    if entry['attempts'] < self.max_attempts:
+                        retry.append(entry)
+                        continue
+                    logger.error(
+                        'Пост %s не записан после %s попыток',
+                        entry['key'], entry['attempts'],
+                    )
+                self.pending.pop(entry['key'], None)
+            if self.journal is not None:
+                self.mark_done(done_keys)
+        for entry in retry:
+            self.entries.put(entry)
+        retried = {entry['key'] for entry in retry}
+        for entry in batch:
+            if entry['key'] in retried:
+                continue
+            if entry['key'] in self.uncounted:
+                self.uncounted.discard(entry['key'])
+            else:
+                self.capacity.release()
+        return len(retry)
+
+    def mark_done(self, keys):
+        """Отмечает keys записанными в журнале; вызывается под lock."""
+        try:
+            self.journal.write({'done': sorted(keys)})
+            size = self.journal.file.tell()
+            if not self.pending and size > JOURNAL_COMPACT_BYTES:
+                self.journal.compact([])
+        except OSError:
+            # Без отметки done пачка после перезапуска запишется
+            # повторно: это допускает гарантия «хотя бы один раз».
+            logger.exception('Журнал отложенной записи не обновлён')
+
+    def drain(self):
+        """Записывает всё, что уже в очереди, в текущем потоке."""
+        while True:
+            batch = self.take_batch(timeout=0)
+            if not batch:
+                return
+            self.write_batch(batch)
+
+    def run(self):
+        try:
+            while not self.stopping.is_set():
+                batch = self.take_batch(timeout=0.5)
+                if not batch:
+                    continue
+                try:
+                    # Как между запросами: сломанное или старое
+                    # соединение с БД заменяется новым.
+                    close_old_connections()
+                except Exception:
+                    logger.exception('Соединение с БД не обновлено')
+                # write_batch() не бросает исключений: поток-писатель не
+                # должен умирать, иначе очередь заполнится и post_create
+                # навсегда ответит 503.
+                retried = self.write_batch(batch)
+                if retried:
+                    self.stopping.wait(self.retry_delay)
+            self.drain()
+        finally:
+            connections.close_all()
+
+    def start(self):
+        self.worker = threading.Thread(
+            target=self.run, name='posts-write-behind', daemon=True
+        )
+        self.worker.start()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        if self.worker is not None:
+            self.worker.join(timeout)
+        if self.journal is not None:
+            self.journal.close()
+
+
+def get_queue():
+    """Очередь процесса или None, если отложенная запись выключена."""
+    global _queue
+    config = settings.POSTS_WRITE_BEHIND
+    if not config['ENABLED']:
+        return None
+    with _lock:
+        if _queue is None:
+            _queue = WriteBehindQueue(
+                max_pending=config['MAX_PENDING'],
+                put_timeout=config['PUT_TIMEOUT'],
+                batch_size=config['BATCH_SIZE'],
+                flush_interval=config['FLUSH_INTERVAL'],
+                journal=config['JOURNAL'],
+                journal_fsync=config['JOURNAL_FSYNC'],
+                max_attempts=config['MAX_ATTEMPTS'],
+                retry_delay=config['RETRY_DELAY'],
+            )
+            _queue.start()
+            atexit.register(_queue.stop)
+    return _queue
+
+
+def pending_posts(user):
+    """Ещё не записанные посты пользователя (read-your-writes).
+
+    Очередь своя у каждого процесса: автор видит пост, если попал в
+    тот же процесс, что и принял его, — с одним процессом всегда.
+    """
+    write_queue = get_queue()
+    if write_queue is None or not user.is_authenticated:
+        return []
+    return write_queue.pending_for(user.pk)
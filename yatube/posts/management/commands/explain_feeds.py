@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.paginators import KeysetPaginator
+from posts.views import POSTS_ON_PAGE
+
+# Признак сортировки без индекса в плане SQLite
+FILESORT_MARKERS = ('USE TEMP B-TREE',)
+
+
+class Command(BaseCommand):
+    help = (
+        'Печатает планы запросов лент posts.views с индексами Post '
+        'и без них, отмечая сортировки без индекса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page', type=int, default=100,
+            help='Номер страницы для запросов с OFFSET.',
+        )
+
+    def get_feed_querysets(self, page):
+        """Запросы, которые выполняют представления лент."""
+        group_id = Group.objects.values_list('pk', flat=True).first() or 1
+        author_id = User.objects.values_list('pk', flat=True).first() or 1
+        post = Post.objects.first()
+        post_id = post.pk if post else 1
+        cursor = (post.pub_date, post.pk) if post else (timezone.now(), 1)
+        feeds = {
+            'posts:index': Post.objects.for_feed('index'),
+            'posts:group_post': Post.objects.filter(
+                group_id=group_id).for_feed('group_list'),
+            'posts:profile': Post.objects.filter(
+                author_id=author_id).for_feed('profile'),
+        }
+        offset = (page - 1) * POSTS_ON_PAGE
+        querysets = []
+        for name, queryset in feeds.items():
+            paginator = KeysetPaginator(queryset, POSTS_ON_PAGE)
+            querysets.extend((
+                (f'{name} ?page={page}',
+                 queryset[offset:offset + POSTS_ON_PAGE]),
+                (f'{name} ?after=', paginator.get_queryset(after=cursor)),
+                (f'{name} ?before=', paginator.get_queryset(before=cursor)),
+            ))
+        querysets.append((
+            'posts:post_detail',
+            Post.objects.for_feed('post_detail').filter(pk=post_id),
+        ))
+        return querysets
+
+    def explain_all(self, querysets):
+        filesorts = 0
+        for name, queryset in querysets:
+            plan = queryset.explain()
+            is_filesort = any(marker in plan for marker in FILESORT_MARKERS)
+            filesorts += is_filesort
+            style = self.style.WARNING if is_filesort else self.style.SUCCESS
+            self.stdout.write(style(name))
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+        return filesorts
+
+    def handle(self, *args, **options):
+        querysets = self.get_feed_querysets(options['page'])
+        self.stdout.write(self.style.MIGRATE_HEADING('До: без индексов'))
+        if connection.features.can_rollback_ddl:
+            # Удаляем индексы в транзакции и откатываем её после EXPLAIN,
+            # схема базы при этом не меняется.
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for index in Post._meta.indexes:
+                        cursor.execute(
+                            'DROP INDEX '
+                            + connection.ops.quote_name(index.name)
+                        )
+                before = self.explain_all(querysets)
+                transaction.set_rollback(True)
+            self.stdout.write(f'Сортировок без индекса: {before}')
+        else:
+            self.stdout.write(
+                'База не поддерживает откат DDL, план без индексов пропущен.'
+            )
+        self.stdout.write(self.style.MIGRATE_HEADING('После: с индексами'))
+        after = self.explain_all(querysets)
+        self.stdout.write(f'Сортировок без индекса: {after}')
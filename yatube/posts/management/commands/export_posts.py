@@ -0,0 +1,76 @@
+import csv
+import json
+import sys
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from posts.management.progress import Progress
+from posts.models import Post
+
+FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты в JSONL или CSV потоково, читая базу '
+        'кусками через iterator().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл или «-» для stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла, по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из базы за раз.',
+        )
+        parser.add_argument(
+            '--progress-every', type=int, default=10000,
+            help='Как часто печатать прогресс, в строках.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        rows = Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'author__username', 'group__slug'
+        ).iterator(chunk_size=options['chunk_size'])
+        # При выгрузке в stdout прогресс пишем в stderr
+        progress = Progress(
+            self.stderr if path == '-' else self.stdout,
+            options['progress_every'],
+        )
+        stream = (
+            sys.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        try:
+            if file_format == 'csv':
+                writer = csv.writer(stream)
+                writer.writerow(FIELDS)
+                for row in rows:
+                    writer.writerow(
+                        (*row[:2], row[2].isoformat(), *row[3:])
+                    )
+                    progress.advance(1)
+            else:
+                for row in rows:
+                    stream.write(json.dumps(
+                        dict(zip(FIELDS, row)),
+                        cls=DjangoJSONEncoder,
+                        ensure_ascii=False,
+                    ))
+                    stream.write('\n')
+                    progress.advance(1)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        progress.report('Выгружено')
@@ -0,0 +1,221 @@
+import csv
+import json
+import sys
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from posts import cache, directory, search, timeline
+from posts.counters import rebuild_post_counters
+from posts.management.progress import Progress
+from posts.models import Group, Post, User
+
+# Не больше стольких id в одном UPDATE ... WHERE id IN (...).
+UPDATE_BATCH_SIZE = 500
+
+
+class RecordError(Exception):
+    """Ошибка в записи файла; line — номер её строки."""
+
+    def __init__(self, line, error):
+        super().__init__(line, error)
+        self.line = line
+        self.error = error
+
+
+def parse_record(record):
+    pub_date = None
+    if record.get('pub_date'):
+        pub_date = parse_datetime(record['pub_date'])
+        if pub_date is None:
+            raise ValueError(f'неверная дата {record["pub_date"]!r}')
+    return {
+        'text': record['text'],
+        'author': record['author'],
+        'group': record.get('group') or None,
+        'pub_date': pub_date,
+    }
+
+
+def read_records(stream, file_format):
+    """Разобранные записи файла; ошибку сообщает RecordError."""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                row = next(reader, None)
+                if row is None:
+                    return
+                record = parse_record(row)
+            except (ValueError, KeyError, csv.Error) as error:
+                raise RecordError(reader.line_num, error)
+            yield record
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = parse_record(json.loads(line))
+        except (ValueError, KeyError) as error:
+            raise RecordError(number, error)
+        yield record
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты из JSONL или CSV потоково, пачками bulk_create. '
+        'Поля записи: text, author (username), group (slug), pub_date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или «-» для stdin.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла, по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов записывать одной транзакцией.',
+        )
+        parser.add_argument(
+            '--create-missing', action='store_true',
+            help='Создавать незнакомых авторов и группы.',
+        )
+        parser.add_argument(
+            '--progress-every', type=int, default=10000,
+            help='Как часто печатать прогресс, в строках.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        self.create_missing = options['create_missing']
+        self.authors = {}
+        self.groups = {}
+        self.skipped = 0
+        self.imported = 0
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        progress = Progress(self.stdout, options['progress_every'])
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        try:
+            records = read_records(stream, file_format)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                self.import_batch(batch)
+                progress.advance(len(batch))
+        except RecordError as error:
+            raise CommandError(
+                f'Ошибка в строке {error.line}: {error.error}'
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            # Записанные до ошибки пачки остаются в базе, и счётчики,
+            # поиск и кеш должны их учесть.
+            if self.imported:
+                self.finish_import(last_pk)
+        progress.report('Загружено')
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено записей с неизвестным автором: {self.skipped}'
+            ))
+
+    def resolve(self, lookup, model, field, names, defaults):
+        """Находит id по именам, запрашивая базу только о новых."""
+        missing = {name for name in names if name and name not in lookup}
+        if missing:
+            found = model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk')
+            lookup.update(found)
+            missing.difference_update(lookup)
+        if missing and self.create_missing:
+            model.objects.bulk_create(
+                model(**{field: name}, **defaults(name)) for name in missing
+            )
+            lookup.update(
+                model.objects.filter(
+                    **{f'{field}__in': missing}
+                ).values_list(field, 'pk')
+            )
+
+    def import_batch(self, batch):
+        self.resolve(
+            self.authors, User, 'username',
+            {record['author'] for record in batch},
+            lambda name: {},
+        )
+        self.resolve(
+            self.groups, Group, 'slug',
+            {record['group'] for record in batch},
+            lambda name: {'title': name},
+        )
+        posts = []
+        dates = []
+        for record in batch:
+            author_id = self.authors.get(record['author'])
+            if author_id is None:
+                self.skipped += 1
+                continue
+            posts.append(Post(
+                text=record['text'],
+                author_id=author_id,
+                group_id=self.groups.get(record['group']),
+            ))
+            dates.append(record['pub_date'])
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            self.set_pub_dates(posts, dates)
+        self.imported += len(posts)
+
+    def set_pub_dates(self, posts, dates):
+        """Возвращает даты из файла: auto_now_add в bulk_create
+        записал вместо них текущее время."""
+        if posts and posts[0].pk is None:
+            # SQLite не возвращает id из bulk_create. Транзакция держит
+            # блокировку записи, поэтому последние строки — наши.
+            pks = sorted(
+                Post.objects.order_by('-pk').values_list(
+                    'pk', flat=True
+                )[:len(posts)]
+            )
+        else:
+            pks = [post.pk for post in posts]
+        by_date = defaultdict(list)
+        for pk, pub_date in zip(pks, dates):
+            if pub_date is not None:
+                by_date[pub_date].append(pk)
+        for pub_date, date_pks in by_date.items():
+            for start in range(0, len(date_pks), UPDATE_BATCH_SIZE):
+                Post.objects.filter(
+                    pk__in=date_pks[start:start + UPDATE_BATCH_SIZE]
+                ).update(pub_date=pub_date)
+
+    def finish_import(self, last_pk):
+        """Досчитывает то, что bulk_create делает в обход сигналов."""
+        rebuild_post_counters()
+        # После пересчёта: followers_count решает, кто из авторов
+        # слишком популярен для раскладки по лентам.
+        timeline.fan_out_imported(last_pk)
+        new_posts = Post.objects.filter(pk__gt=last_pk).values_list(
+            'pk', 'text'
+        ).order_by('pk').iterator()
+        backend = search.get_backend()
+        while True:
+            rows = list(islice(new_posts, 1000))
+            if not rows:
+                break
+            with transaction.atomic():
+                backend.index_rows(rows)
+        cache.invalidate_index_feed()
+        directory.invalidate_group_directory()
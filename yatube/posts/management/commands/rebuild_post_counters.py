@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import rebuild_post_counters
+from posts.models import AuthorStats, Group
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов авторов и групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Размер пачки при записи счётчиков авторов.',
+        )
+
+    def handle(self, *args, **options):
+        rebuild_post_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны: авторов {AuthorStats.objects.count()}, '
+            f'групп {Group.objects.count()}.'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит поисковый индекс постов. Нужна после миграции '
+        '0007, которая создаёт только таблицу, и после смены стеммера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов индексировать одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс перестроен: постов {total}.'
+        ))
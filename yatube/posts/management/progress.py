@@ -0,0 +1,30 @@
+import time
+
+
+class Progress:
+    """Печатает число обработанных строк и скорость раз в every строк."""
+
+    def __init__(self, stream, every=10000):
+        self.stream = stream
+        self.every = every
+        self.count = 0
+        self.started = time.monotonic()
+        self._next_report = every
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def advance(self, count):
+        self.count += count
+        if self.count >= self._next_report:
+            self.report()
+            self._next_report = self.count + self.every
+
+    def report(self, prefix='Обработано'):
+        elapsed = time.monotonic() - self.started
+        self.stream.write(
+            f'{prefix}: {self.count} строк за {elapsed:.1f} с '
+            f'({self.rate:.0f} строк/с)'
+        )
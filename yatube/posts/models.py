@@ -1,9 +1,76 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.expressions import CombinedExpression
+from django.utils import timezone
 
 
 User = get_user_model()
 
+# Поля, которые читает includes/post_card.html, для каждого варианта
+# карточки (значение переменной stats в шаблоне).
+POST_CARD_FIELDS = ('text', 'pub_date', 'version', 'author', 'group')
+AUTHOR_CARD_FIELDS = (
+    'author__username', 'author__first_name', 'author__last_name',
+)
+GROUP_CARD_FIELDS = ('group__slug', 'group__title', 'group__version')
+FEED_FIELDS = {
+    'index': AUTHOR_CARD_FIELDS + GROUP_CARD_FIELDS,
+    'group_list': AUTHOR_CARD_FIELDS,
+    'profile': GROUP_CARD_FIELDS,
+    'post_detail': (
+        AUTHOR_CARD_FIELDS
+        + GROUP_CARD_FIELDS
+        + ('author__post_stats__posts_count',)
+    ),
+}
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self, stats='index'):
+        """Посты с авторами и группами, загруженными одним запросом.
+
+        Подтягивает через JOIN только те связи и поля, которые нужны
+        карточке поста в данном варианте ленты, чтобы шаблон не делал
+        по запросу на каждого автора и группу.
+        """
+        fields = FEED_FIELDS[stats]
+        related = sorted({field.rsplit('__', 1)[0] for field in fields})
+        return self.select_related(*related).only(*POST_CARD_FIELDS, *fields)
+
+    def update(self, **kwargs):
+        # Массовое изменение — тоже правка: ключи кеша должны смениться.
+        kwargs.setdefault('version', F('version') + 1)
+        kwargs.setdefault('updated_at', timezone.now())
+        return super().update(**kwargs)
+
+
+def versioned_save(instance, save, *args, **kwargs):
+    """Сохраняет объект, увеличивая его version при каждой правке.
+
+    Версия растёт в самом UPDATE (version = version + 1), поэтому две
+    одновременные правки не получат одинаковый номер.
+    """
+    if not instance._state.adding:
+        instance.version = F('version') + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, 'version', 'updated_at'
+            }
+    with transaction.atomic():
+        save(*args, **kwargs)
+
+
+def refresh_version(instance, using):
+    """Заменяет F('version') + 1 на записанный номер.
+
+    Вызывается из _save_table(), до post_save: обработчики сигнала
+    строят ключи кеша из instance.version и должны видеть число.
+    """
+    if isinstance(instance.version, CombinedExpression):
+        instance.refresh_from_db(using=using, fields=['version'])
+
 
 class Post(models.Model):
     text = models.TextField(
@@ -11,6 +78,10 @@ class Post(models.Model):
         help_text='Напишите что-то, за что не будет стыдно'
     )
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    version = models.PositiveIntegerField(
+        'Версия', default=1, editable=False
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -25,17 +96,171 @@ class Post(models.Model):
         verbose_name='Группа'
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
+        # Индексы под ленты: общую, автора и группы. Хвост (pub_date, id)
+        # совпадает с порядком курсорной пагинации, поэтому ни одна
+        # лента не сортирует строки во временном B-дереве.
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'), name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx'
+            ),
+            # Последняя правка автора и группы для ETag: одна строка
+            # индекса вместо MAX() по всем постам.
+            models.Index(
+                fields=('author', '-updated_at'),
+                name='post_author_updated_at_idx'
+            ),
+            models.Index(
+                fields=('group', '-updated_at'),
+                name='post_group_updated_at_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        # Счётчики постов обновляются в обработчиках post_save,
+        # они должны попасть в ту же транзакцию, что и сам пост.
+        versioned_save(self, super().save, *args, **kwargs)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False,
+                    force_update=False, using=None, update_fields=None):
+        updated = super()._save_table(
+            raw, cls, force_insert, force_update, using, update_fields
+        )
+        refresh_version(self, using)
+        return updated
+
 
 class Group(models.Model):
     title = models.CharField('Имя группы', max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField('Описание')
+    posts_count = models.IntegerField(
+        'Количество постов', default=0, editable=False
+    )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    version = models.PositiveIntegerField(
+        'Версия', default=1, editable=False
+    )
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        # Счётчик ведут сигналы постов: при редактировании группы
+        # не перезаписываем его устаревшим значением из памяти.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skipped = self.get_deferred_fields() | {'posts_count'}
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        versioned_save(self, super().save, *args, **kwargs)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False,
+                    force_update=False, using=None, update_fields=None):
+        updated = super()._save_table(
+            raw, cls, force_insert, force_update, using, update_fields
+        )
+        refresh_version(self, using)
+        return updated
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='post_stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.IntegerField('Количество постов', default=0)
+    followers_count = models.IntegerField('Количество подписчиков', default=0)
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя.
+
+    Записи создаются при публикации поста (fan-out on write), поэтому
+    лента читается одним проходом по индексу (user, pub_date, post).
+    pub_date дублирует дату поста ради этого индекса.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-post'),
+                name='timeline_user_pub_date_idx'
+            ),
+        )
+
+
+def get_posts_count(author):
+    """Количество постов автора по счётчику, без COUNT(*)."""
+    try:
+        return author.post_stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
@@ -0,0 +1,124 @@
+import base64
+import binascii
+from collections.abc import Sequence
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(pub_date, pk):
+    """Упаковывает ключ (pub_date, id) в непрозрачную строку для URL."""
+    raw = f'{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (pub_date, id) из курсора или None, если он испорчен."""
+    if not cursor:
+        return None
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    return pub_date, pk
+
+
+class KeysetPage(Sequence):
+    """Страница ленты, совместимая по интерфейсу с django Page.
+
+    Номера страниц и общее количество не известны, поэтому шаблон
+    пагинатора рисует только ссылки «назад» и «вперёд» по курсорам.
+    """
+    is_keyset = True
+    number = None
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Keyset page of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not (self.has_next() and self.object_list):
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(last.pub_date, last.pk)
+
+    @property
+    def previous_cursor(self):
+        if not (self.has_previous() and self.object_list):
+            return None
+        first = self.object_list[0]
+        return encode_cursor(first.pub_date, first.pk)
+
+
+class KeysetPaginator:
+    """Постраничный вывод по ключу (pub_date, id).
+
+    В отличие от django Paginator не выполняет COUNT(*) и не сканирует
+    OFFSET строк: каждая страница — это один запрос с условием по ключу
+    последнего (или первого) показанного поста и LIMIT per_page + 1.
+    """
+    page_class = KeysetPage
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list.order_by('-pub_date', '-pk')
+        self.per_page = per_page
+
+    def get_queryset(self, after=None, before=None):
+        """Запрос одной страницы с лишним постом для проверки has_next.
+
+        Курсоры передаются уже разобранными: кортежами (pub_date, id).
+        """
+        limit = self.per_page + 1
+        if before is not None:
+            pub_date, pk = before
+            return self.object_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).reverse()[:limit]
+        queryset = self.object_list
+        if after is not None:
+            pub_date, pk = after
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )
+        return queryset[:limit]
+
+    def page(self, after=None, before=None):
+        after = decode_cursor(after)
+        before = decode_cursor(before)
+        posts = list(self.get_queryset(after=after, before=before))
+        if before is not None:
+            has_previous = len(posts) > self.per_page
+            posts = posts[:self.per_page][::-1]
+            # Пустая страница «назад» — курсор новее всех постов.
+            return self.page_class(posts, self, bool(posts), has_previous)
+        has_next = len(posts) > self.per_page
+        return self.page_class(
+            posts[:self.per_page], self, has_next, after is not None
+        )
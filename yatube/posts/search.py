@@ -0,0 +1,273 @@
+import base64
+import binascii
+import math
+import re
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Post
+from .stemmer import stem
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Основы слов текста в порядке появления."""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
+
+
+def fts5_available(db_connection):
+    if db_connection.vendor != 'sqlite':
+        return False
+    with db_connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+def encode_cursor(score, pk):
+    raw = f'{score!r}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, pk = raw.rsplit('|', 1)
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+class Fts5SearchBackend:
+    """Индекс в виртуальной таблице SQLite FTS5.
+
+    В таблицу пишутся уже выделенные основы слов, поэтому встроенный
+    токенайзер unicode61 находит разные формы одного слова. Меньшая
+    оценка bm25() означает более релевантный пост.
+    """
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokenize(post.text))],
+            )
+
+    def remove_post(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+    def index_rows(self, rows):
+        """Добавляет в индекс новые посты из пар (pk, text)."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(pk, ' '.join(tokenize(text))) for pk, text in rows],
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, terms, limit, after=None):
+        match = ' '.join(f'"{term}"' for term in terms)
+        score, pk = after if after is not None else (-math.inf, 0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT pk, score FROM ('
+                f'SELECT rowid AS pk, bm25({FTS_TABLE}) AS score '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s) '
+                f'WHERE score > %s OR (score = %s AND pk > %s) '
+                f'ORDER BY score, pk LIMIT %s',
+                [match, score, score, pk, limit],
+            )
+            return [(score, pk) for pk, score in cursor.fetchall()]
+
+
+class PythonSearchBackend:
+    """Обратный индекс в памяти процесса для баз без FTS5.
+
+    Строится из таблицы Post при первом поиске и дальше обновляется
+    сигналами. Ранжирование — BM25 со знаком минус, как у FTS5.
+    """
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = defaultdict(dict)
+        self.document_terms = {}
+        self.lengths = {}
+        self.built = False
+
+    def _add(self, pk, text):
+        terms = tokenize(text)
+        self.lengths[pk] = len(terms)
+        self.document_terms[pk] = set(terms)
+        for term in terms:
+            self.postings[term][pk] = self.postings[term].get(pk, 0) + 1
+
+    def _remove(self, pk):
+        self.lengths.pop(pk, None)
+        for term in self.document_terms.pop(pk, ()):
+            documents = self.postings[term]
+            documents.pop(pk, None)
+            if not documents:
+                del self.postings[term]
+
+    def build(self):
+        with self.lock:
+            if self.built:
+                return
+            posts = Post.objects.values_list('pk', 'text').iterator()
+            for pk, text in posts:
+                self._add(pk, text)
+            self.built = True
+
+    def index_post(self, post):
+        with self.lock:
+            if self.built:
+                self._remove(post.pk)
+                self._add(post.pk, post.text)
+
+    def remove_post(self, pk):
+        with self.lock:
+            if self.built:
+                self._remove(pk)
+
+    def index_rows(self, rows):
+        with self.lock:
+            if self.built:
+                for pk, text in rows:
+                    self._add(pk, text)
+
+    def clear(self):
+        """Забывает индекс: он построится заново при следующем поиске."""
+        with self.lock:
+            self.postings.clear()
+            self.document_terms.clear()
+            self.lengths.clear()
+            self.built = False
+
+    def search(self, terms, limit, after=None):
+        self.build()
+        with self.lock:
+            documents = [self.postings.get(term, {}) for term in terms]
+            if not documents or not self.lengths:
+                return []
+            candidates = set.intersection(*(set(d) for d in documents))
+            total = len(self.lengths)
+            average = sum(self.lengths.values()) / total or 1
+            results = []
+            for pk in candidates:
+                norm = self.k1 * (
+                    1 - self.b + self.b * self.lengths[pk] / average
+                )
+                score = 0.0
+                for matches in documents:
+                    idf = math.log(
+                        (total - len(matches) + 0.5) / (len(matches) + 0.5)
+                        + 1
+                    )
+                    tf = matches[pk]
+                    score -= idf * tf * (self.k1 + 1) / (tf + norm)
+                results.append((score, pk))
+        results.sort()
+        if after is not None:
+            results = [result for result in results if result > after]
+        return results[:limit]
+
+
+_backends = {}
+
+
+def rebuild_index(batch_size=1000):
+    """Переиндексирует все посты; возвращает их число."""
+    backend = get_backend()
+    backend.clear()
+    if isinstance(backend, PythonSearchBackend):
+        # Индекс в памяти построится сам при первом поиске.
+        return Post.objects.count()
+    posts = Post.objects.values_list('pk', 'text').order_by('pk').iterator()
+    total = 0
+    with transaction.atomic():
+        while True:
+            rows = list(islice(posts, batch_size))
+            if not rows:
+                return total
+            backend.index_rows(rows)
+            total += len(rows)
+
+
+def get_backend():
+    """Движок поиска по настройке POSTS_SEARCH_BACKEND."""
+    name = settings.POSTS_SEARCH_BACKEND
+    if name == 'auto':
+        # Таблицу FTS5 создаёт миграция, если SQLite собран с FTS5
+        if 'auto' not in _backends:
+            tables = connection.introspection.table_names()
+            _backends['auto'] = 'fts5' if FTS_TABLE in tables else 'python'
+        name = _backends['auto']
+    if name not in _backends:
+        backend_classes = {
+            'fts5': Fts5SearchBackend,
+            'python': PythonSearchBackend,
+        }
+        _backends[name] = backend_classes[name]()
+    return _backends[name]
+
+
+class SearchPage:
+    """Страница результатов поиска с курсором на следующую."""
+
+    def __init__(self, posts, last_result, has_next):
+        self.object_list = posts
+        self.last_result = last_result
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return encode_cursor(*self.last_result)
+
+
+def search_posts(query, per_page, after=None):
+    """Посты, подходящие под запрос, от самых релевантных."""
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return SearchPage([], None, False)
+    results = get_backend().search(
+        terms, per_page + 1, after=decode_cursor(after)
+    )
+    has_next = len(results) > per_page
+    results = results[:per_page]
+    posts = Post.objects.for_feed('index').in_bulk(
+        [pk for score, pk in results]
+    )
+    # Индекс может ненадолго отставать от таблицы постов
+    return SearchPage(
+        [posts[pk] for score, pk in results if pk in posts],
+        results[-1] if results else None,
+        has_next,
+    )
@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, directory, search, timeline
+from .models import AuthorStats, Follow, Group, Post, User
+
+
+def shift_author_count(author_id, delta, create=True, field='posts_count'):
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and create:
+        # Счётчика ещё нет (первый пост или подписчик): считаем с нуля.
+        AuthorStats.objects.update_or_create(
+            author_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id).count(),
+                'followers_count': Follow.objects.filter(
+                    author_id=author_id).count(),
+            },
+        )
+
+
+def shift_group_count(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_owners(sender, instance, raw=False, **kwargs):
+    """Запоминает прежних автора и группу редактируемого поста."""
+    instance._previous_owners = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_owners = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('author_id', 'group_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_owners', None)
+    if created or previous is None:
+        shift_author_count(instance.author_id, 1)
+        shift_group_count(instance.group_id, 1)
+        return
+    author_id, group_id = previous
+    if author_id != instance.author_id:
+        shift_author_count(author_id, -1)
+        shift_author_count(instance.author_id, 1)
+    if group_id != instance.group_id:
+        shift_group_count(group_id, -1)
+        shift_group_count(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    # Автор может удаляться вместе со своими постами, поэтому
+    # недостающий счётчик здесь не создаём.
+    shift_author_count(instance.author_id, -1, create=False)
+    shift_group_count(instance.group_id, -1)
+
+
+def invalidate_now_and_on_commit(func):
+    # Второй сброс после коммита не даёт параллельному запросу
+    # закешировать страницу со старой версией поста.
+    func()
+    transaction.on_commit(func)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feed_on_save(sender, instance, created, **kwargs):
+    pk = instance.pk
+    invalidate_now_and_on_commit(
+        lambda: cache.invalidate_post(pk, shifts_feed=created)
+    )
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feed_on_delete(sender, instance, **kwargs):
+    pk = instance.pk
+    invalidate_now_and_on_commit(
+        lambda: cache.invalidate_post(pk, shifts_feed=True)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def invalidate_feed_on_related_save(sender, update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, его не учитываем.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_now_and_on_commit(cache.invalidate_index_feed)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    search.get_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_on_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def update_timeline_on_follow(sender, instance, created, raw=False,
+                              **kwargs):
+    if not created or raw:
+        return
+    shift_author_count(instance.author_id, 1, field='followers_count')
+    timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def update_timeline_on_unfollow(sender, instance, **kwargs):
+    shift_author_count(
+        instance.author_id, -1, create=False, field='followers_count'
+    )
+    timeline.purge(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_directory_on_post_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_owners', None)
+    if created or (previous and previous[1] != instance.group_id):
+        invalidate_now_and_on_commit(directory.invalidate_group_directory)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_directory(sender, **kwargs):
+    invalidate_now_and_on_commit(directory.invalidate_group_directory)
@@ -0,0 +1,112 @@
+# Стеммер Портера для русского языка (алгоритм Snowball):
+# https://snowballstem.org/algorithms/russian/stemmer.html
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def find_regions(word):
+    """Начала областей RV и R2 в слове."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def strip_ending(word, start, endings, after_a=()):
+    """Отрезает самое длинное из окончаний, лежащее целиком после start.
+
+    Окончания из after_a отрезаются, только если перед ними стоит
+    «а» или «я» из той же области. Возвращает None, если не нашлось.
+    """
+    matches = [
+        ending for ending in endings + after_a
+        if word.endswith(ending) and len(word) - len(ending) >= start
+    ]
+    if not matches:
+        return None
+    ending = max(matches, key=len)
+    cut = len(word) - len(ending)
+    if ending in after_a and ending not in endings:
+        if cut - 1 < start or word[cut - 1] not in 'ая':
+            return None
+    return word[:cut]
+
+
+def strip_adjectival(word, rv):
+    stripped = strip_ending(word, rv, ADJECTIVE)
+    if stripped is None:
+        return None
+    participle = strip_ending(stripped, rv, PARTICIPLE[1], PARTICIPLE[0])
+    return stripped if participle is None else participle
+
+
+def stem(word):
+    """Основа русского слова в нижнем регистре."""
+    word = word.lower().replace('ё', 'е')
+    rv, r2 = find_regions(word)
+    # Шаг 1: деепричастие либо возвратность и окончание
+    # прилагательного, глагола или существительного.
+    stripped = strip_ending(
+        word, rv, PERFECTIVE_GERUND[1], PERFECTIVE_GERUND[0]
+    )
+    if stripped is None:
+        word = strip_ending(word, rv, REFLEXIVE) or word
+        stripped = (
+            strip_adjectival(word, rv)
+            or strip_ending(word, rv, VERB[1], VERB[0])
+            or strip_ending(word, rv, NOUN)
+        )
+    if stripped is not None:
+        word = stripped
+    # Шаг 2
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    # Шаг 3: словообразовательный суффикс в R2
+    word = strip_ending(word, r2, DERIVATIONAL) or word
+    # Шаг 4
+    if word.endswith('нн'):
+        return word[:-1]
+    stripped = strip_ending(word, rv, SUPERLATIVE)
+    if stripped is not None:
+        return stripped[:-1] if stripped.endswith('нн') else stripped
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
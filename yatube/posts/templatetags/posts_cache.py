@@ -0,0 +1,21 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cache
+
+register = template.Library()
+
+
+@register.simple_tag
+def version_key(*objects):
+    """{% version_key post post.group as key %} для тега {% cache %}."""
+    return cache.version_key(*objects)
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, stats=''):
+    """{% post_cards page_obj 'profile' as cards %}: HTML карточек."""
+    return [
+        mark_safe(card)
+        for card in cache.render_post_cards(list(posts), stats, context)
+    ]
@@ -0,0 +1,141 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import api
+from ..models import Group, Post
+from ..paginators import encode_cursor
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(15):
+            Post.objects.create(
+                author=cls.user if number % 2 else cls.other,
+                group=cls.group if number % 3 else None,
+                text=f'Пост {number}',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(response.content)
+
+    def test_cursor_pagination_walks_all_posts(self):
+        url = reverse('posts:api_post_list')
+        data = self.get(url)
+        self.assertEqual(len(data['data']), api.API_PAGE_SIZE)
+        self.assertIsNone(data['links']['previous'])
+        rest = self.client.get(data['links']['next']).json()
+        self.assertIsNone(rest['links']['next'])
+        back = self.client.get(rest['links']['previous']).json()
+        self.assertEqual(back['data'], data['data'])
+        ids = [post['id'] for post in data['data'] + rest['data']]
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_before_newest_post_is_empty_page(self):
+        newest = Post.objects.latest('pub_date', 'pk')
+        data = self.get(
+            reverse('posts:api_post_list'),
+            before=encode_cursor(newest.pub_date, newest.pk),
+        )
+        self.assertEqual(data['data'], [])
+        self.assertIsNone(data['links']['next'])
+
+    def test_sparse_fields_and_include(self):
+        """fields= сужает ответ, include= подгружает связи пачкой."""
+        url = reverse('posts:api_post_list')
+        with self.assertNumQueries(3):
+            data = self.get(
+                url, fields='text,author', include='author,group',
+                **{'fields[author]': 'username'}, limit=15,
+            )
+        self.assertEqual(set(data['data'][0]), {'id', 'text', 'author'})
+        self.assertEqual(
+            data['included']['author'],
+            [
+                {'id': self.user.pk, 'username': 'auth'},
+                {'id': self.other.pk, 'username': 'other'},
+            ],
+        )
+        self.assertEqual(
+            [group['slug'] for group in data['included']['group']],
+            [self.group.slug],
+        )
+        with self.assertNumQueries(1):
+            self.get(url, fields='text')
+
+    def test_group_and_profile(self):
+        data = self.get(reverse('posts:api_group', args=[self.group.slug]))
+        self.assertEqual(data['data']['posts_count'], 10)
+        data = self.get(
+            reverse('posts:api_group_posts', args=[self.group.slug]),
+            limit=50,
+        )
+        self.assertEqual(len(data['data']), 10)
+        data = self.get(
+            reverse('posts:api_profile', args=['auth']),
+            fields='first_name,posts_count',
+        )
+        self.assertEqual(
+            data['data'],
+            {'id': self.user.pk, 'first_name': 'Лев', 'posts_count': 7},
+        )
+        data = self.get(
+            reverse('posts:api_profile_posts', args=['auth']), limit=50)
+        self.assertEqual(len(data['data']), 7)
+        data = self.get(reverse('posts:api_group_list'))
+        self.assertEqual(data['data'][0]['slug'], self.group.slug)
+
+    def test_post_detail(self):
+        post = Post.objects.filter(group=self.group).first()
+        data = self.get(
+            reverse('posts:api_post_detail', args=[post.pk]),
+            include='group',
+        )
+        self.assertEqual(data['data']['text'], post.text)
+        self.assertEqual(data['data']['group'], self.group.pk)
+        self.assertEqual(
+            data['data']['pub_date'], post.pub_date.isoformat())
+        self.assertEqual(data['included']['group'][0]['id'], self.group.pk)
+
+    def test_errors_are_json(self):
+        self.get(
+            reverse('posts:api_post_detail', args=[10 ** 6]), status=404)
+        self.get(reverse('posts:api_profile', args=['nobody']), status=404)
+        data = self.get(
+            reverse('posts:api_post_list'), status=400, fields='password')
+        self.assertIn('password', data['error'])
+        self.get(reverse('posts:api_post_list'), status=400, limit='x')
+        response = self.client.post(reverse('posts:api_post_list'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_standard_json_fallback(self):
+        """Без orjson ответ тот же, только медленнее."""
+        url = reverse('posts:api_post_list')
+        fast = self.client.get(url).json()
+        with mock.patch.object(api, 'orjson', None):
+            slow = self.client.get(url).json()
+        self.assertEqual(fast, slow)
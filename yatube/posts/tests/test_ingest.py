@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.signals import post_save
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import ingest
+from ..models import Group, Post, get_posts_count
+
+User = get_user_model()
+
+
+class WriteBehindTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.queue = ingest.WriteBehindQueue(flush_interval=0)
+        patcher = mock.patch.object(
+            ingest, 'get_queue', return_value=self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.author_client = Client()
+        self.author_client.force_login(self.user)
+
+    def test_post_is_saved_in_batch(self):
+        """Пост из формы ждёт в очереди и пишется при сбросе пачки."""
+        response = self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Отложенный пост', 'group': self.group.pk},
+        )
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.user.username]))
+        self.assertFalse(Post.objects.exists())
+        self.queue.put(Post(author=self.user, text='Второй'))
+        with mock.patch.object(
+                self.queue, 'write_batch',
+                wraps=self.queue.write_batch) as write_batch:
+            self.queue.drain()
+        write_batch.assert_called_once()
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='Отложенный пост')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(get_posts_count(self.user), 2)
+
+    def test_author_sees_pending_posts(self):
+        """Автор видит свой пост до записи, остальные — нет."""
+        url = reverse('posts:profile', args=[self.user.username])
+        before = self.author_client.get(url)
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Отложенный пост'})
+        response = self.author_client.get(
+            url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Ожидает публикации')
+        self.assertContains(response, 'Отложенный пост')
+        self.assertNotContains(self.client.get(url), 'Отложенный пост')
+        self.queue.drain()
+        response = self.author_client.get(url)
+        self.assertNotContains(response, 'Ожидает публикации')
+        self.assertContains(response, 'Отложенный пост')
+
+    def test_full_queue_rejects_form(self):
+        self.queue = ingest.WriteBehindQueue(max_pending=1, put_timeout=0)
+        ingest.get_queue.return_value = self.queue
+        url = reverse('posts:post_create')
+        self.author_client.post(url, {'text': 'Первый'})
+        response = self.author_client.post(url, {'text': 'Второй'})
+        self.assertEqual(response.status_code, 503)
+        self.queue.drain()
+        response = self.author_client.post(url, {'text': 'Второй'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_journal_survives_restart(self):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        first = ingest.WriteBehindQueue(journal=path)
+        first.put(Post(author=self.user, text='Из журнала'))
+        first.stop()
+        second = ingest.WriteBehindQueue(journal=path, flush_interval=0)
+        self.assertEqual(len(second.pending_for(self.user.pk)), 1)
+        second.drain()
+        second.stop()
+        self.assertTrue(Post.objects.filter(text='Из журнала').exists())
+        third = ingest.WriteBehindQueue(journal=path)
+        third.stop()
+        self.assertEqual(third.pending_for(self.user.pk), [])
+
+    def test_failed_posts_are_requeued(self):
+        """Пост, на котором упал обработчик post_save, пишется повторно."""
+        failures = [RuntimeError('кеш недоступен')] * 2
+
+        def receiver(sender, instance, **kwargs):
+            if failures:
+                raise failures.pop()
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        self.queue.put(Post(author=self.user, text='Повтор'))
+        with self.assertLogs('posts.ingest', 'ERROR'):
+            self.queue.drain()
+        self.assertTrue(Post.objects.filter(text='Повтор').exists())
+        self.assertEqual(self.queue.pending_for(self.user.pk), [])
+
+    def test_post_is_dropped_after_max_attempts(self):
+        self.queue = ingest.WriteBehindQueue(
+            max_pending=1, put_timeout=0, flush_interval=0, max_attempts=2)
+
+        def receiver(sender, instance, **kwargs):
+            raise RuntimeError('поиск недоступен')
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        self.queue.put(Post(author=self.user, text='Не запишется'))
+        with self.assertLogs('posts.ingest', 'ERROR') as logs:
+            self.queue.drain()
+        self.assertIn('после 2 попыток', logs.output[-1])
+        self.assertEqual(self.queue.pending_for(self.user.pk), [])
+        # Место в очереди освободилось.
+        self.queue.put(Post(author=self.user, text='Следующий'))
+
+    def test_writer_thread_survives_errors(self):
+        """Пачка, на которой упала запись, возвращается в очередь."""
+        calls = []
+
+        def save_batch(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError('сбой')
+            return batch
+
+        self.queue.retry_delay = 0.01
+        with mock.patch.object(self.queue, 'save_batch',
+                               side_effect=save_batch), \
+                mock.patch.object(ingest, 'close_old_connections'), \
+                mock.patch.object(ingest, 'connections'), \
+                self.assertLogs('posts.ingest', 'ERROR'):
+            self.queue.start()
+            self.queue.put(Post(author=self.user, text='Первый'))
+            deadline = time.monotonic() + 5
+            while len(calls) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.queue.stop(timeout=5)
+        self.assertFalse(self.queue.worker.is_alive())
+        self.assertEqual(
+            [[entry['text'] for entry in batch] for batch in calls],
+            [['Первый'], ['Первый']],
+        )
+        self.assertEqual(self.queue.pending_for(self.user.pk), [])
+
+    def test_journal_belongs_to_one_process(self):
+        path = os.path.join(self.directory, 'posts.jsonl')
+        first = ingest.WriteBehindQueue(journal=path)
+        self.addCleanup(first.stop)
+        with self.assertRaises(ImproperlyConfigured):
+            ingest.WriteBehindQueue(journal=path)
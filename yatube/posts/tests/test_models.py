@@ -1,7 +1,17 @@
+import os
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models.signals import post_save
 from django.test import TestCase
+from django.urls import reverse
 
-from ..models import Post, Group
+from ..cache import version_key
+from ..directory import group_directory_page
+from ..models import Post, Group, get_posts_count
 
 User = get_user_model()
 
@@ -41,3 +51,235 @@ class PostModelTest(TestCase):
             post._meta.get_field('text').help_text,
             'Напишите что-то, за что не будет стыдно')
         self.assertEqual(post._meta.get_field('group').verbose_name, 'Группа')
+
+
+class PostCountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other_user = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, user_count, group_count):
+        self.assertEqual(
+            get_posts_count(User.objects.get(pk=self.user.pk)), user_count)
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, group_count)
+
+    def test_counters_follow_post_lifecycle(self):
+        """Счётчики меняются при создании, переносе и удалении поста."""
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='Тестовый пост')
+        Post.objects.create(author=self.user, text='Пост без группы')
+        self.assertCounters(2, 1)
+        post.group = self.other_group
+        post.author = self.other_user
+        post.save()
+        self.assertCounters(1, 0)
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).posts_count, 1)
+        self.assertEqual(
+            get_posts_count(User.objects.get(pk=self.other_user.pk)), 1)
+        post.delete()
+        self.assertEqual(
+            Group.objects.get(pk=self.other_group.pk).posts_count, 0)
+        self.assertEqual(
+            get_posts_count(User.objects.get(pk=self.other_user.pk)), 0)
+
+    def test_group_save_keeps_counter(self):
+        """Редактирование группы не затирает счётчик постов."""
+        stale_group = Group.objects.get(pk=self.group.pk)
+        Post.objects.create(
+            author=self.user, group=self.group, text='Тестовый пост')
+        stale_group.title = 'Новое имя'
+        stale_group.save()
+        self.assertCounters(1, 1)
+
+    def test_rebuild_command_after_bulk_create(self):
+        """Команда rebuild_post_counters учитывает bulk_create."""
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=f'Пост {n}')
+            for n in range(3)
+        )
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters(3, 3)
+
+
+class VersionTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(author=self.user, text='Пост')
+
+    def test_every_kind_of_edit_bumps_version(self):
+        """save(), save(update_fields) и update() увеличивают version."""
+        self.assertEqual(self.post.version, 1)
+        self.post.text = 'Правка'
+        self.post.save()
+        self.assertEqual(self.post.version, 2)
+        self.post.save(update_fields=['text'])
+        self.assertEqual(self.post.version, 3)
+        Post.objects.filter(pk=self.post.pk).update(text='Массовая правка')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.version, 4)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое имя'
+        group.save()
+        self.assertEqual(group.version, 2)
+
+    def test_post_save_receivers_see_version_number(self):
+        """Обработчики post_save получают номер версии, а не F()."""
+        seen = []
+
+        def receiver(sender, instance, **kwargs):
+            seen.append(instance.version)
+
+        post_save.connect(receiver, sender=Post)
+        self.addCleanup(post_save.disconnect, receiver, sender=Post)
+        self.post.text = 'Правка'
+        self.post.save()
+        self.assertEqual(seen, [2])
+
+    def test_admin_list_editable_bumps_version(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+            'form-0-id': self.post.pk,
+            'form-0-group': self.group.pk,
+            '_save': 'Сохранить',
+        })
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.group, self.group)
+        self.assertEqual(self.post.version, 2)
+
+    def test_key_changes_with_related_group(self):
+        """Ключ фрагмента меняется при правке поста и его группы."""
+        before = version_key(self.post, self.post.group)
+        self.post.group = self.group
+        self.post.save()
+        with_group = version_key(self.post, self.post.group)
+        self.group.description = 'Новое описание'
+        self.group.save()
+        self.assertEqual(
+            len({before, with_group, version_key(self.post, self.group)}), 3
+        )
+
+    def test_post_detail_fragment_follows_edit(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        self.assertContains(self.client.get(url), 'Отредактированный пост')
+
+
+class PostTransferCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост с группой')
+        Post.objects.create(author=cls.user, text='Пост без группы')
+
+    def test_export_import_round_trip(self):
+        """Выгруженные посты загружаются обратно с датами и группами."""
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(file_format=file_format):
+                with tempfile.TemporaryDirectory() as directory:
+                    path = os.path.join(directory, f'posts.{file_format}')
+                    call_command('export_posts', path, stdout=StringIO())
+                    Post.objects.all().delete()
+                    call_command(
+                        'import_posts', path, batch_size=1,
+                        stdout=StringIO(),
+                    )
+                self.assertEqual(
+                    sorted(Post.objects.values_list('text', 'group')),
+                    [('Пост без группы', None),
+                     ('Пост с группой', self.group.pk)]
+                )
+                self.assertEqual(get_posts_count(
+                    User.objects.get(pk=self.user.pk)), 2)
+
+    def test_import_creates_missing_authors_and_groups(self):
+        """С --create-missing незнакомые автор и группа создаются."""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write(
+                '{"text": "Импорт", "author": "new", "group": "new-group", '
+                '"pub_date": "2020-01-02T03:04:05+00:00"}\n'
+            )
+            file.flush()
+            call_command('import_posts', file.name, stdout=StringIO())
+            self.assertFalse(Post.objects.filter(text='Импорт').exists())
+            call_command(
+                'import_posts', file.name, create_missing=True,
+                stdout=StringIO(),
+            )
+        post = Post.objects.get(text='Импорт')
+        self.assertEqual(post.author.username, 'new')
+        self.assertEqual(post.group.slug, 'new-group')
+        self.assertEqual(post.pub_date.year, 2020)
+
+    def test_failed_import_keeps_counters_consistent(self):
+        """Ошибка в файле не оставляет записанные пачки без счётчиков."""
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write(
+                '{"text": "Первый", "author": "auth", '
+                '"pub_date": "2020-01-02T03:04:05+00:00"}\n'
+                '\n'
+                '{"text": "Второй", "author": "auth", "pub_date": "вчера"}\n'
+            )
+            file.flush()
+            with self.assertRaisesMessage(CommandError, 'в строке 3:'):
+                call_command(
+                    'import_posts', file.name, batch_size=1,
+                    stdout=StringIO(),
+                )
+        self.assertEqual(
+            Post.objects.get(text='Первый').pub_date.year, 2020)
+        self.assertEqual(get_posts_count(
+            User.objects.get(pk=self.user.pk)), 3)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+
+    def test_import_refreshes_cached_group_directory(self):
+        """Импорт в группу обновляет закешированный каталог групп."""
+        cache.clear()
+        before = group_directory_page(10).object_list
+        self.assertEqual(before[0]['posts_count'], 1)
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write(
+                '{"text": "В группу", "author": "auth", '
+                '"group": "test-slug"}\n'
+            )
+            file.flush()
+            call_command('import_posts', file.name, stdout=StringIO())
+        after = group_directory_page(10).object_list
+        self.assertEqual(after[0]['posts_count'], 2)
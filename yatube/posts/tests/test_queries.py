@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..views import POSTS_ON_PAGE
+
+User = get_user_model()
+
+
+class FeedQueryBudgetTests(TestCase):
+    """Количество запросов к БД не зависит от числа постов на странице."""
+    # Бюджет запросов на страницу для анонимного посетителя. В ленты
+    # группы и автора и страницу поста входит запрос для ETag.
+    budgets = {
+        'posts:index': 2,
+        'posts:group_post': 4,
+        'posts:profile': 4,
+        'posts:post_detail': 2,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Имя', last_name='Фамилия'
+        )
+        authors = [cls.user] + [
+            User.objects.create_user(username=f'author{n}')
+            for n in range(POSTS_ON_PAGE)
+        ]
+        groups = [cls.group] + [
+            Group.objects.create(
+                title=f'Группа {n}',
+                slug=f'group-{n}',
+                description='Описание',
+            )
+            for n in range(POSTS_ON_PAGE)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                author=authors[n % len(authors)],
+                group=groups[n % len(groups)],
+                text=f'Тестовый пост {n}',
+            )
+            for n in range(POSTS_ON_PAGE * 2)
+        )
+        # Ещё посты того же автора и группы, чтобы их ленты заняли две страницы
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {n}')
+            for n in range(POSTS_ON_PAGE)
+        )
+        cls.post = Post.objects.filter(author=cls.user).first()
+
+    def assert_within_budget(self, name, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), self.budgets[name],
+            '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def get_urls(self):
+        return {
+            'posts:index': reverse('posts:index'),
+            'posts:group_post': reverse(
+                'posts:group_post', args=[self.group.slug]),
+            'posts:profile': reverse(
+                'posts:profile', args=[self.user.username]),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[self.post.id]),
+        }
+
+    def test_feed_pages_fit_query_budget(self):
+        """Ленты и страница поста укладываются в бюджет запросов."""
+        for name, url in self.get_urls().items():
+            for query in ('', '?page=2'):
+                with self.subTest(url=url + query):
+                    self.assert_within_budget(name, url + query)
+
+    @override_settings(POSTS_PAGINATION='keyset')
+    def test_keyset_feed_pages_fit_query_budget(self):
+        """Курсорные ленты укладываются в бюджет запросов."""
+        for name, url in self.get_urls().items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                page_obj = response.context.get('page_obj')
+                if page_obj is not None:
+                    url += f'?after={page_obj.next_cursor}'
+                self.assert_within_budget(name, url)
+
+
+class ExplainFeedsCommandTests(TestCase):
+    def test_feeds_use_indexes(self):
+        """С индексами ни одна лента не сортирует строки без индекса."""
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertTrue(
+            out.getvalue().rstrip().endswith('Сортировок без индекса: 0'),
+            out.getvalue()
+        )
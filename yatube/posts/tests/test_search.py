@@ -0,0 +1,93 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы одного слова сводятся к общей основе."""
+        forms = {
+            'книг': ('книга', 'книги', 'книгами', 'книгах'),
+            'красив': ('красивая', 'красивые', 'красивого'),
+            'елк': ('ёлки', 'елка'),
+        }
+        for expected, words in forms.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=text)
+            for text in (
+                'Читаю интересную книгу',
+                'Книги, книги и ещё раз книги',
+                'Пост про котов',
+            )
+        ]
+
+    def test_fts5_backend_finds_word_forms(self):
+        """Поиск находит посты по другой форме слова."""
+        page = search.search_posts('книгами', per_page=10)
+        self.assertEqual(
+            [post.pk for post in page], [p.pk for p in self.posts[1::-1]]
+        )
+
+    def test_rebuild_command_indexes_bulk_created_posts(self):
+        """rebuild_search_index находит посты, добавленные в обход сигналов."""
+        Post.objects.bulk_create([Post(author=self.user, text='Про книжку')])
+        post = Post.objects.get(text='Про книжку')
+        self.assertNotIn(post, list(search.search_posts('книжки', 10)))
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertIn(post, list(search.search_posts('книжки', 10)))
+        self.assertEqual(len(search.search_posts('книга', 10)), 2)
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление поста обновляют индекс."""
+        post = self.posts[2]
+        post.text = 'Теперь пост про книгу'
+        post.save()
+        self.assertIn(post, list(search.search_posts('книга', 10)))
+        post.delete()
+        self.assertNotIn(post, list(search.search_posts('книга', 10)))
+
+    def test_python_backend_matches_fts5_order(self):
+        """Обратный индекс в памяти ранжирует так же, как FTS5."""
+        expected = list(search.search_posts('книга', 10))
+        with override_settings(POSTS_SEARCH_BACKEND='python'):
+            # Свежий индекс строится из тестовой базы при первом поиске
+            search._backends.pop('python', None)
+            self.addCleanup(search._backends.pop, 'python', None)
+            self.assertEqual(
+                list(search.search_posts('книга', 10)), expected
+            )
+
+    def test_search_page_is_paginated_by_cursor(self):
+        """Страницы результатов связаны курсором."""
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'книги'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 2)
+        self.assertFalse(page_obj.has_next())
+        first = search.search_posts('книги', per_page=1)
+        self.assertTrue(first.has_next())
+        response = self.client.get(
+            url, {'q': 'книги', 'after': first.next_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), [self.posts[0]]
+        )
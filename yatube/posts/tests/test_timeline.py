@@ -0,0 +1,116 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import AuthorStats, Follow, Post, TimelineEntry
+from ..paginators import encode_cursor
+from ..timeline import timeline_page
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def timeline_texts(self, **kwargs):
+        page = timeline_page(self.reader, 10, **kwargs)
+        return [post.text for post in page]
+
+    def test_follow_backfills_and_fans_out(self):
+        """Подписка переносит старые посты, новые попадают в ленту сразу."""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(
+            self.timeline_texts(), ['Новый пост', 'Пост до подписки'])
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 1)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_unfollow_purges_timeline(self):
+        """После отписки посты автора пропадают из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.timeline_texts(), [])
+        self.assertEqual(
+            AuthorStats.objects.get(author=self.author).followers_count, 0)
+
+    def test_imported_posts_reach_followers(self):
+        """Посты из import_posts попадают в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as file:
+            file.write(
+                '{"text": "Импорт", "author": "author", '
+                '"pub_date": "2030-01-02T03:04:05+00:00"}\n'
+                '{"text": "Чужой импорт", "author": "stranger"}\n'
+            )
+            file.flush()
+            call_command('import_posts', file.name, stdout=StringIO())
+        self.assertEqual(
+            self.timeline_texts(), ['Импорт', 'Пост до подписки'])
+        entry = TimelineEntry.objects.get(post__text='Импорт')
+        self.assertEqual(entry.pub_date.year, 2030)
+
+    def test_self_follow_is_ignored(self):
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.reader.username]))
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(FOLLOW_FANOUT_LIMIT=2)
+    def test_popular_author_is_merged_on_read(self):
+        """Посты популярного автора читаются без записей в ленте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Post.objects.create(author=self.stranger, text='Обычный пост')
+        Post.objects.create(author=self.author, text='Пост популярного')
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__text='Пост популярного').exists())
+        self.assertEqual(
+            self.timeline_texts(),
+            ['Пост популярного', 'Обычный пост', 'Пост до подписки'],
+        )
+
+    def test_timeline_cursors(self):
+        """Курсоры ленты подписок листают вперёд и назад без повторов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for n in range(11):
+            Post.objects.create(author=self.author, text=f'Пост {n}')
+        first = timeline_page(self.reader, 10)
+        second = timeline_page(self.reader, 10, after=first.next_cursor)
+        self.assertEqual(
+            [post.text for post in second], ['Пост 0', 'Пост до подписки'])
+        self.assertFalse(second.has_next())
+        back = timeline_page(self.reader, 10, before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_before_newest_post_is_empty_page(self):
+        """Курсор «назад» от самого нового поста не ломает ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        first = timeline_page(self.reader, 10)
+        cursor = encode_cursor(first[0].pub_date, first[0].pk)
+        response = self.client.get(
+            reverse('posts:follow_index') + f'?before={cursor}')
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next())
@@ -1,9 +1,13 @@
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django import forms
+from django.core.cache import cache
 
+from core import profiling
+from ..cache import index_page_key
 from ..models import Group, Post
+from ..paginators import encode_cursor
 
 User = get_user_model()
 
@@ -166,3 +170,360 @@ class PaginatorViewsTest(TestCase):
             # Проверка: на второй странице должно быть три поста.
             response = self.client.get(reverse(url, args=args) + '?page=2')
             self.assertEqual(len(response.context['page_obj']), 3)
+
+    @override_settings(POSTS_PAGINATION='keyset')
+    def test_keyset_pages_follow_cursors(self):
+        """Курсорная пагинация проходит ленту вперёд и назад."""
+        for url, args in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(reverse(url, args=args))
+                first_page = first.context['page_obj']
+                self.assertEqual(len(first_page), 10)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+                second = self.client.get(
+                    reverse(url, args=args)
+                    + f'?after={first_page.next_cursor}'
+                )
+                second_page = second.context['page_obj']
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                back = self.client.get(
+                    reverse(url, args=args)
+                    + f'?before={second_page.previous_cursor}'
+                )
+                self.assertEqual(
+                    list(back.context['page_obj']), list(first_page)
+                )
+
+    def test_before_newest_post_is_empty_page(self):
+        """Курсор «назад» от самого нового поста даёт пустую страницу."""
+        newest = Post.objects.latest('pub_date', 'pk')
+        cursor = encode_cursor(newest.pub_date, newest.pk)
+        for url, args in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    reverse(url, args=args) + f'?before={cursor}')
+                self.assertEqual(response.status_code, 200)
+                page = response.context['page_obj']
+                self.assertEqual(len(page), 0)
+                self.assertFalse(page.has_next())
+                self.assertIsNone(page.next_cursor)
+
+    def test_broken_cursor_opens_first_page(self):
+        """Испорченный курсор не ломает страницу."""
+        response = self.client.get(reverse('posts:index') + '?after=xyz')
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+
+class IndexFeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_page_served_from_cache(self):
+        """Повторный запрос главной не обращается к БД."""
+        self.client.get(reverse('posts:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_edit_invalidates_cached_page(self):
+        """Правка поста сбрасывает страницу, на которой он показан."""
+        self.client.get(reverse('posts:index'))
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный пост')
+
+    def test_new_post_invalidates_cached_page(self):
+        """Новый пост появляется на закешированной главной."""
+        self.client.get(reverse('posts:index'))
+        Post.objects.create(author=self.user, text='Свежий пост')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_group_rename_invalidates_cached_page(self):
+        """Переименование группы видно на главной."""
+        self.client.get(reverse('posts:index'))
+        self.group.title = 'Новое имя группы'
+        self.group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое имя группы')
+
+    def test_broken_cursors_share_first_page_key(self):
+        """Мусорные курсоры не создают новых ключей кеша."""
+        factory = RequestFactory()
+        url = reverse('posts:index')
+        keys = {
+            index_page_key(factory.get(url, {name: value}))
+            for name in ('after', 'before')
+            for value in ('xyz', 'garbage ' * 40, 'not|a|cursor')
+        }
+        self.assertEqual(len(keys), 1)
+        cursor = encode_cursor(self.post.pub_date, self.post.pk)
+        key = index_page_key(factory.get(url, {'after': cursor + '=='}))
+        self.assertEqual(
+            key, index_page_key(factory.get(url, {'after': cursor})))
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_post', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_page_returns_304(self):
+        """Неизменившаяся страница отдаётся ответом 304 без тела."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn('no-cache', response['Cache-Control'])
+                revalidated = self.revalidate(url, response)
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated.content, b'')
+
+    def assertChanged(self, responses):
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(url, response).status_code, 200)
+
+    def test_edit_and_delete_change_etag(self):
+        """Правка и удаление поста меняют ETag всех его страниц."""
+        responses = {url: self.client.get(url) for url in self.urls}
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        self.assertChanged(responses)
+        extra = Post.objects.create(
+            author=self.user, group=self.group, text='Ещё')
+        responses = {url: self.client.get(url) for url in self.urls[:3]}
+        extra.delete()
+        self.assertChanged(responses)
+
+    def test_etag_depends_on_user(self):
+        response = self.client.get(self.urls[0])
+        self.client.force_login(self.user)
+        self.assertChanged({self.urls[0]: response})
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for n in range(3):
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Пост {n}')
+
+    def setUp(self):
+        cache.clear()
+        profiling.registry.reset()
+
+    def test_cards_are_reused_and_counted(self):
+        """Повторная страница берёт все карточки из кеша."""
+        url = reverse('posts:group_post', args=[self.group.slug])
+        first = self.client.get(url)
+        second = self.client.get(url)
+        self.assertEqual(first.content, second.content)
+        counters = profiling.registry.snapshot()['posts:group_post']
+        self.assertEqual(
+            counters['counters'],
+            {'post_card_hits': 3, 'post_card_misses': 3},
+        )
+
+    def test_edit_renders_card_again(self):
+        """Правленый пост и переименованная группа видны сразу."""
+        url = reverse('posts:profile', args=[self.user.username])
+        self.client.get(url)
+        post = Post.objects.filter(author=self.user).first()
+        post.text = 'Отредактированный пост'
+        post.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое имя группы'
+        group.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Отредактированный пост')
+        self.assertContains(response, 'Новое имя группы', count=3)
+
+
+class GroupDirectoryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {n}', slug=f'group-{n:02}', description='')
+            for n in range(55)
+        ]
+        Post.objects.create(
+            author=cls.user, group=cls.groups[0], text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_directory_pages_by_slug(self):
+        """Каталог листается курсором по slug без пропусков."""
+        url = reverse('posts:group_index')
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first), 50)
+        self.assertEqual(first[0]['posts_count'], 1)
+        self.assertIsNotNone(first[0]['latest'])
+        self.assertIsNone(first[1]['latest'])
+        second = self.client.get(
+            url + f'?after={first.next_cursor}').context['page_obj']
+        self.assertEqual(
+            [group['slug'] for group in second],
+            [f'group-{n}' for n in range(50, 55)],
+        )
+        back = self.client.get(
+            url + f'?before={second.previous_cursor}').context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_before_first_slug_is_empty_page(self):
+        """Курсор «назад» левее всех slug даёт пустую страницу."""
+        response = self.client.get(
+            reverse('posts:group_index') + '?before=a')
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 0)
+        self.assertIsNone(page.next_cursor)
+
+    def test_directory_cache_follows_post_writes(self):
+        """Страница каталога берётся из кеша до нового поста."""
+        url = reverse('posts:group_index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Post.objects.create(
+            author=self.user, group=self.groups[1], text='Новый пост')
+        page = self.client.get(url).context['page_obj']
+        self.assertEqual(page[1]['posts_count'], 1)
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='auth', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.urls = (
+            reverse('posts:feed', args=['rss']),
+            reverse('posts:group_feed', args=[self.group.slug, 'atom']),
+            reverse('posts:profile_feed', args=[self.user.username, 'rss']),
+        )
+
+    def read(self, response):
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def test_feeds_stream_posts(self):
+        """Ленты отдаются потоком и содержат пост со ссылкой на него."""
+        link = reverse('posts:post_detail', args=[self.post.pk])
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.streaming)
+                self.assertIn('public', response['Cache-Control'])
+                body = self.read(response)
+                self.assertIn('Тестовый пост', body)
+                self.assertIn(f'http://testserver{link}', body)
+                self.assertIn('Лев Толстой', body)
+        self.assertIn('<rss', body)
+        atom = self.read(self.client.get(self.urls[1]))
+        self.assertIn('xmlns="http://www.w3.org/2005/Atom"', atom)
+
+    def test_unknown_feed_returns_404(self):
+        urls = (
+            reverse('posts:feed', args=['json']),
+            reverse('posts:group_feed', args=['missing', 'rss']),
+            reverse('posts:profile_feed', args=['missing', 'rss']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_polling_is_cheap(self):
+        """Повторный опрос: 304 без запросов или лента из кеша."""
+        url = self.urls[0]
+        response = self.client.get(url)
+        body = self.read(response)
+        with self.assertNumQueries(0):
+            revalidated = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content.decode(), body)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_new_post_changes_feeds(self):
+        responses = {url: self.client.get(url) for url in self.urls}
+        for response in responses.values():
+            self.read(response)
+        Post.objects.create(
+            author=self.user, group=self.group, text='Свежий пост')
+        for url, response in responses.items():
+            with self.subTest(url=url):
+                fresh = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(fresh.status_code, 200)
+                self.assertIn('Свежий пост', self.read(fresh))
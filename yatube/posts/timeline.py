@@ -0,0 +1,152 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import KeysetPage, decode_cursor
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def is_celebrity(author_id):
+    """Слишком много подписчиков, чтобы раскладывать посты по лентам."""
+    return AuthorStats.objects.filter(
+        author_id=author_id,
+        followers_count__gte=settings.FOLLOW_FANOUT_LIMIT,
+    ).exists()
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_imported(last_pk):
+    """Раскладывает по лентам посты с id больше last_pk.
+
+    bulk_create в import_posts обходит post_save и fan_out_post, поэтому
+    загруженные посты добавляются в ленты подписчиков здесь.
+    """
+    posts = Post.objects.filter(pk__gt=last_pk).exclude(
+        author__post_stats__followers_count__gte=(
+            settings.FOLLOW_FANOUT_LIMIT
+        ),
+    ).order_by('pk').values_list('pk', 'author_id', 'pub_date')
+    followers = {}
+
+    def entries():
+        for pk, author_id, pub_date in posts.iterator():
+            if author_id not in followers:
+                followers[author_id] = list(
+                    Follow.objects.filter(
+                        author_id=author_id
+                    ).values_list('user_id', flat=True)
+                )
+            for user_id in followers[author_id]:
+                yield TimelineEntry(
+                    user_id=user_id, post_id=pk, pub_date=pub_date
+                )
+
+    # bulk_create собирает все объекты в список: подаём частями.
+    pending = entries()
+    while True:
+        batch = list(islice(pending, FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def backfill(user_id, author_id):
+    """Переносит в ленту нового подписчика последние посты автора."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def purge(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def keyset_slice(queryset, pk_field, limit, after=None, before=None):
+    """Пары (pub_date, id) одной страницы, как в KeysetPaginator."""
+    if before is not None:
+        pub_date, pk = before
+        queryset = queryset.filter(
+            Q(pub_date__gt=pub_date)
+            | Q(pub_date=pub_date, **{f'{pk_field}__gt': pk})
+        ).order_by('pub_date', pk_field)
+    else:
+        if after is not None:
+            pub_date, pk = after
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date)
+                | Q(pub_date=pub_date, **{f'{pk_field}__lt': pk})
+            )
+        queryset = queryset.order_by('-pub_date', f'-{pk_field}')
+    return list(queryset.values_list('pub_date', pk_field)[:limit])
+
+
+def timeline_page(user, per_page, after=None, before=None):
+    """Страница ленты подписок пользователя.
+
+    Посты обычных авторов читаются из TimelineEntry одним проходом по
+    индексу. Посты авторов, у которых подписчиков не меньше
+    FOLLOW_FANOUT_LIMIT, в ленты не раскладываются и подмешиваются при
+    чтении отдельным запросом по индексу (author, pub_date, id).
+    """
+    after = decode_cursor(after)
+    before = decode_cursor(before)
+    limit = per_page + 1
+    keys = keyset_slice(
+        TimelineEntry.objects.filter(user=user),
+        'post_id', limit, after, before,
+    )
+    celebrities = list(
+        Follow.objects.filter(
+            user=user,
+            author__post_stats__followers_count__gte=(
+                settings.FOLLOW_FANOUT_LIMIT
+            ),
+        ).values_list('author_id', flat=True)
+    )
+    if celebrities:
+        keys += keyset_slice(
+            Post.objects.filter(author_id__in=celebrities),
+            'pk', limit, after, before,
+        )
+    keys = sorted(set(keys), reverse=before is None)[:limit]
+    has_more = len(keys) > per_page
+    keys = keys[:per_page]
+    if before is not None:
+        keys.reverse()
+    posts = Post.objects.for_feed('index').in_bulk(
+        [pk for pub_date, pk in keys]
+    )
+    posts = [posts[pk] for pub_date, pk in keys if pk in posts]
+    if before is not None:
+        return KeysetPage(posts, None, bool(posts), has_more)
+    return KeysetPage(posts, None, has_more, after is not None)
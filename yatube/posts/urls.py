@@ -1,14 +1,61 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 
 app_name = 'posts'
 
 urlpatterns = [
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_post, name='group_post'),
+    path(
+        'group/<slug:slug>/feed/<str:fmt>/',
+        views.post_feed,
+        name='group_feed'
+    ),
     path('', views.index, name='index'),
+    path('feed/<str:fmt>/', views.post_feed, name='feed'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/feed/<str:fmt>/',
+        views.post_feed,
+        name='profile_feed'
+    ),
+    path(
+        'profile/<str:username>/follow/',
+        views.profile_follow,
+        name='profile_follow'
+    ),
+    path(
+        'profile/<str:username>/unfollow/',
+        views.profile_unfollow,
+        name='profile_unfollow'
+    ),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
+    path('follow/', views.follow_index, name='follow_index'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('api/posts/', api.post_list, name='api_post_list'),
+    path(
+        'api/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path('api/groups/', api.group_list, name='api_group_list'),
+    path('api/groups/<slug:slug>/', api.group_detail, name='api_group'),
+    path(
+        'api/groups/<slug:slug>/posts/',
+        api.group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/profiles/<str:username>/',
+        api.profile_detail,
+        name='api_profile'
+    ),
+    path(
+        'api/profiles/<str:username>/posts/',
+        api.profile_posts,
+        name='api_profile_posts'
+    ),
 ]
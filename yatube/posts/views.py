@@ -1,34 +1,69 @@
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from django.contrib.auth.decorators import login_required
+from django.utils.functional import SimpleLazyObject
+from . import ingest
+from .cache import cached_index_feed, feed_cache
+from .directory import group_directory_page
+from .conditional import (
+    conditional_page, group_etag, index_etag, post_detail_etag,
+    profile_etag,
+)
+from .feeds import (
+    FEED_FORMATS, cache_stream, feed_cache_key, feed_etag, feed_posts,
+    stream_feed,
+)
 from .forms import PostForm
-from .models import Post, Group, User
+from .models import Follow, Post, Group, User, get_posts_count
+from .paginators import KeysetPaginator
+from .search import search_posts
+from .timeline import timeline_page
 
 
 POSTS_ON_PAGE = 10
+GROUPS_ON_PAGE = 50
 
 
 def custom_paginator(request, post_list):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if settings.POSTS_PAGINATION == 'keyset' or after or before:
+        # Курсорный режим: без COUNT(*) и OFFSET, глубокие страницы
+        # открываются так же быстро, как первая.
+        paginator = KeysetPaginator(post_list, POSTS_ON_PAGE)
+        return paginator.page(after=after, before=before)
     paginator = Paginator(post_list, POSTS_ON_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+@conditional_page(index_etag)
 def index(request):
     """Функция-обработчик главной страницы."""
     template = 'posts/index.html'
-    post_list = Post.objects.all()
+    post_list = Post.objects.for_feed('index')
+    # Страница ленты вычисляется только при промахе кеша.
+    page_obj = SimpleLazyObject(
+        lambda: custom_paginator(request, post_list)
+    )
     context = {
-        'page_obj': custom_paginator(request, post_list),
+        'page_obj': page_obj,
+        'feed_html': cached_index_feed(request, page_obj),
     }
     return render(request, template, context)
 
 
+@conditional_page(group_etag)
 def group_post(request, slug):
     """Функция-обработчик страницы запрощенной группы."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.post.all()
+    post_list = group.post.for_feed('group_list')
     context = {
         'page_obj': custom_paginator(request, post_list),
         'group': group,
@@ -36,33 +71,132 @@ def group_post(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_etag)
 def profile(request, username):
     """Здесь код запроса к модели и создание словаря контекста."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.post.all()
+    author = get_object_or_404(
+        User.objects.select_related('post_stats'), username=username
+    )
+    post_list = author.post.for_feed('profile')
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author
+    ).exists()
     context = {
         'page_obj': custom_paginator(request, post_list),
         'author': author,
+        'posts_count': get_posts_count(author),
+        'following': following,
+        'pending_posts': (
+            ingest.pending_posts(request.user)
+            if request.user == author else []
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_detail_etag)
 def post_detail(request, post_id):
     """Здесь код запроса к модели и создание словаря контекста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.for_feed('post_detail'), id=post_id
+    )
     context = {
         'post': post,
+        'posts_count': get_posts_count(post.author),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def group_index(request):
+    """Каталог групп по алфавиту slug, с курсорной пагинацией."""
+    page_obj = group_directory_page(
+        GROUPS_ON_PAGE,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return render(request, 'posts/group_index.html', {'page_obj': page_obj})
+
+
+@condition(etag_func=feed_etag)
+def post_feed(request, fmt, slug=None, username=None):
+    """RSS или Atom: общая лента, лента группы или автора.
+
+    Ответ отдаётся потоком по мере чтения постов из курсора и на
+    POSTS_SYNDICATION_CACHE_TIMEOUT секунд кешируется по ETag.
+    """
+    if fmt not in FEED_FORMATS:
+        raise Http404
+    if slug is not None:
+        group = get_object_or_404(Group, slug=slug)
+        title = f'Yatube: {group.title}'
+        link = reverse('posts:group_post', args=[slug])
+        description = group.description
+    elif username is not None:
+        author = get_object_or_404(User, username=username)
+        title = f'Yatube: посты {author.get_full_name() or username}'
+        link = reverse('posts:profile', args=[username])
+        description = title
+    else:
+        title = 'Yatube: последние обновления'
+        link = reverse('posts:index')
+        description = title
+    content_type = FEED_FORMATS[fmt].content_type
+    key = feed_cache_key(request.feed_etag)
+    body = feed_cache().get(key)
+    if body is not None:
+        response = HttpResponse(body, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            cache_stream(key, stream_feed(
+                request, fmt, feed_posts(slug=slug, username=username),
+                title=title,
+                link=request.build_absolute_uri(link),
+                description=description,
+            )),
+            content_type=content_type,
+        )
+    patch_cache_control(
+        response, public=True,
+        max_age=settings.POSTS_SYNDICATION_CACHE_TIMEOUT,
+    )
+    return response
+
+
+def search(request):
+    """Поиск постов по тексту с учётом словоформ."""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search_posts(
+            query, POSTS_ON_PAGE, after=request.GET.get('after')
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        write_queue = ingest.get_queue()
+        if write_queue is None:
+            new_post.save()
+            return redirect('posts:profile', username=new_post.author)
+        try:
+            write_queue.put(new_post)
+        except ingest.QueueFull:
+            form.add_error(
+                None, 'Слишком много новых постов, попробуйте чуть позже.'
+            )
+            return render(
+                request, 'posts/create_post.html', {'form': form},
+                status=503,
+            )
         return redirect('posts:profile', username=new_post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -86,3 +220,32 @@ def post_edit(request, post_id):
             return redirect('posts:post_detail', post_id=post_id)
         return render(request, 'posts/create_post.html', context)
     return render(request, 'posts/create_post.html', context)
+
+
+@login_required
+def follow_index(request):
+    """Лента постов авторов, на которых подписан пользователь."""
+    page_obj = timeline_page(
+        request.user,
+        POSTS_ON_PAGE,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return render(request, 'posts/follow.html', {'page_obj': page_obj})
+
+
+@login_required
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    author = get_object_or_404(User, username=username)
+    # delete() по одному объекту, чтобы сработали сигналы ленты
+    for follow in Follow.objects.filter(user=request.user, author=author):
+        follow.delete()
+    return redirect('posts:profile', username=username)
@@ -39,24 +39,53 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth.CachedAuthenticationMiddleware',
+    'core.middleware.SessionActivityMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RateLimitMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Шаблоны компилируются один раз на процесс, даже при DEBUG = True.
+# При правке шаблонов без перезапуска сервера выключите TEMPLATE_CACHE.
+TEMPLATE_CACHE = True
+# Эти include подставляются в родительский шаблон при компиляции
+TEMPLATE_INLINE_INCLUDES = (
+    'includes/post_card.html',
+    'includes/paginator.html',
+    'includes/header.html',
+    'includes/footer.html',
+)
+TEMPLATE_LOADERS = [
+    (
+        'core.template_loaders.Loader',
+        [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ],
+    ),
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.ProfiledDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -69,6 +98,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Сколько запросов ASGI-приложение обрабатывает одновременно: столько
+# потоков в пуле, где выполняются представления и запросы к БД.
+ASGI_THREADS = 8
 
 
 # Database
@@ -81,6 +114,131 @@ DATABASES = {
     }
 }
 
+# Реплики только для чтения: YATUBE_DB_REPLICAS=2 добавит replica1 и
+# replica2. Локально их изображают копии db.sqlite3, которые обновляет
+# команда sync_replicas. Тесты запускают без реплик: зеркало тестовой
+# default не видит данных из незакоммиченной транзакции TestCase.
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.environ.get('YATUBE_DB_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+# Представления, которые только читают и могут работать с репликой
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group_post',
+    'posts:profile',
+    'posts:post_detail',
+)
+# Сколько секунд после записи пользователь читает только из default
+REPLICA_STICKY_SECONDS = 30
+REPLICA_STICKY_COOKIE = 'read_primary'
+
+# Профиль SQLite выбирается переменной YATUBE_SQLITE_PROFILE.
+# production: WAL (читатели не ждут писателя), synchronous=NORMAL
+# (без fsync на каждый коммит, надёжно в режиме WAL), mmap вместо
+# read() для страниц базы, ожидание блокировки до 5 секунд и
+# переиспользование соединений между запросами.
+SQLITE_PROFILES = {
+    'stock': {
+        'CONN_MAX_AGE': 0,
+        'PRAGMAS': {},
+    },
+    'production': {
+        'CONN_MAX_AGE': 60,
+        'PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': 256 * 1024 * 1024,
+            'busy_timeout': 5000,
+            'temp_store': 'MEMORY',
+        },
+    },
+}
+SQLITE_PROFILE = os.environ.get('YATUBE_SQLITE_PROFILE', 'stock')
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]['PRAGMAS']
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = SQLITE_PROFILES[SQLITE_PROFILE]['CONN_MAX_AGE']
+
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
+# Хранилище сессий выбирается переменной YATUBE_SESSION_TIER.
+# db — строка django_session читается на каждый запрос вошедшего
+# пользователя; cached_db — чтение из кеша SESSION_CACHE_ALIAS, запись
+# сквозная в кеш и БД, так что кеш можно терять; signed_cookies — вся
+# сессия в подписанной куке, сервер её не хранит, но и отозвать
+# украденную куку до SESSION_COOKIE_AGE нельзя. cached_db годится только
+# с общим для процессов кешем (Memcached, Redis): с LocMemCache выход в
+# одном процессе не сбросит сессию в других, и проверка core.E001 не
+# даст запустить такую конфигурацию.
+SESSION_TIERS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_TIER = os.environ.get('YATUBE_SESSION_TIER', 'db')
+SESSION_ENGINE = SESSION_TIERS[SESSION_TIER]
+SESSION_CACHE_ALIAS = 'default'
+# Отметка last_activity в сессии (и продление её срока) обновляется не
+# чаще раза в столько секунд: каждое обновление — запись сессии.
+SESSION_ACTIVITY_INTERVAL = 5 * 60
+
+# Снимок вошедшего пользователя вместо SELECT из auth_user на каждый
+# запрос: LOCAL_SIZE записей в памяти процесса на LOCAL_TIMEOUT секунд
+# (столько другие процессы могут не знать о смене пароля), за ними —
+# кеш CACHE на TIMEOUT секунд. Кеш CACHE используется, только если он
+# общий для процессов (Memcached, Redis); с LocMemCache снимок после
+# LRU читается из БД.
+AUTH_USER_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 5 * 60,
+    'LOCAL_SIZE': 1000,
+    'LOCAL_TIMEOUT': 5,
+}
+
+
+# Профилирование запросов: время, SQL и шаблоны по представлениям,
+# профили cProfile для доли SAMPLE_RATE запросов. Смотреть агрегаты
+# может персонал на странице core:profiling.
+PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.01,
+    'PROFILE_LIMIT': 30,
+}
+
+
+# Ограничение частоты запросов по имени представления: скользящее
+# окно на счётчиках в кеше CACHE. Для каждого представления — лимиты
+# 'user' (вошедший пользователь), 'ip' и 'global' вида 'число/период',
+# период s, m, h или d. Проверяются по порядку, считаются только
+# запросы с методами из METHODS.
+RATELIMIT = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'METHODS': ('POST',),
+    'VIEWS': {
+        'posts:post_create': {
+            'user': '10/m', 'ip': '30/m', 'global': '600/m',
+        },
+        'posts:post_edit': {'user': '30/m', 'ip': '60/m'},
+        'users:signup': {'ip': '5/h', 'global': '100/h'},
+        'users:login': {'ip': '20/m', 'global': '600/m'},
+        'users:password_reset_form': {'ip': '5/h', 'global': '100/h'},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -126,7 +284,68 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-#  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Режим пагинации лент: 'page' — номера страниц (?page=),
+# 'keyset' — курсоры (?after=/?before=) без подсчёта всех постов.
+POSTS_PAGINATION = 'page'
+
+# Кеш HTML страниц главной ленты: алиас из CACHES и страховочный срок
+# жизни записи. Сбрасывается сигналами при изменении постов.
+POSTS_FEED_CACHE = 'default'
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60
+
+# RSS/Atom: сколько последних постов в ленте и сколько секунд готовая
+# лента хранится в кеше и может храниться у клиентов и в CDN.
+POSTS_FEED_ITEMS = 20
+POSTS_SYNDICATION_CACHE_TIMEOUT = 60
+
+# Поиск по постам: 'fts5' — таблица SQLite FTS5, 'python' — обратный
+# индекс в памяти процесса, 'auto' — FTS5, если таблица создана.
+POSTS_SEARCH_BACKEND = 'auto'
+
+# Ленты подписок: посты авторов, у которых подписчиков не меньше
+# FOLLOW_FANOUT_LIMIT, не раскладываются по лентам при публикации, а
+# подмешиваются при чтении. TIMELINE_BACKFILL — сколько последних постов
+# автора попадает в ленту при подписке.
+FOLLOW_FANOUT_LIMIT = 10000
+TIMELINE_BACKFILL = 100
+
+# Отложенная запись постов (YATUBE_WRITE_BEHIND=1): post_create кладёт
+# пост в очередь, поток-писатель сохраняет до BATCH_SIZE постов одной
+# транзакцией, подождав остальные FLUSH_INTERVAL секунд. Принятых, но
+# не записанных постов не больше MAX_PENDING, новый ждёт места
+# PUT_TIMEOUT секунд, потом форма отвечает 503. Без JOURNAL очередь
+# теряется при остановке процесса; с JOURNAL посты пишутся в файл и
+# после перезапуска дописываются в базу, JOURNAL_FSYNC — с fsync. Пост,
+# который не удалось записать, возвращается в очередь через RETRY_DELAY
+# секунд, но не больше MAX_ATTEMPTS раз. JOURNAL принадлежит одному
+# процессу: при нескольких воркерах задайте каждому свой путь, процесс
+# с уже занятым журналом не запустится.
+POSTS_WRITE_BEHIND = {
+    'ENABLED': os.environ.get('YATUBE_WRITE_BEHIND') == '1',
+    'MAX_PENDING': 1000,
+    'PUT_TIMEOUT': 2.0,
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 0.05,
+    'JOURNAL': os.environ.get('YATUBE_WRITE_BEHIND_JOURNAL'),
+    'JOURNAL_FSYNC': False,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 1.0,
+}
+
+# Письма ставятся в очередь, а отправляет их пул из WORKERS потоков
+# через BACKEND пачками до BATCH_SIZE писем на соединение, с RETRIES
+# повторами при временных ошибках (пауза от RETRY_DELAY секунд,
+# удваивается). Длина очереди видна на странице core:profiling.
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_QUEUE = {
+    # письма по-прежнему складываются файлами в EMAIL_FILE_PATH
+    'BACKEND': 'django.core.mail.backends.filebased.EmailBackend',
+    'WORKERS': 2,
+    'BATCH_SIZE': 20,
+    'FLUSH_INTERVAL': 0.1,
+    'RETRIES': 3,
+    'RETRY_DELAY': 1.0,
+    'MAX_SIZE': 10000,
+}
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')